@@ -0,0 +1,96 @@
+"""Configuration de la base de données à partir de DATABASE_URL.
+
+Formats acceptés :
+
+- ``postgresql://utilisateur:mot_de_passe@hôte:5432/base?sslmode=require``
+  (ou ``postgres://``) : pilote psycopg 3 ;
+- ``sqlite:///relatif.sqlite3``, ``sqlite:////chemin/absolu.sqlite3`` ou
+  ``sqlite://`` (base en mémoire).
+
+Sous PostgreSQL, chaque processus garde un pool de connexions psycopg
+(``DATABASE_POOL_MIN_SIZE`` à ``DATABASE_POOL_MAX_SIZE``, par défaut autant
+que de threads par worker, ``WEB_THREADS``) : une requête emprunte une
+connexion déjà ouverte au lieu d'en établir une. ``DATABASE_POOL=0`` revient
+à des connexions persistantes classiques (``CONN_MAX_AGE``), vérifiées avant
+réutilisation (``CONN_HEALTH_CHECKS``).
+
+Sous SQLite, ``SQLITE_TUNED=1`` active le profil des petites antennes : journal
+WAL (les lecteurs ne bloquent plus derrière un écrivain), ``synchronous=NORMAL``,
+attente d'un verrou (``SQLITE_BUSY_TIMEOUT``, ms) au lieu de l'erreur
+« database is locked », ``mmap_size`` et ``cache_size`` plus grands, et
+transactions ``BEGIN IMMEDIATE`` : une transaction d'écriture prend le verrou
+dès le début au lieu d'échouer en voulant passer de lecture à écriture.
+"""
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+ENGINES = {
+    'postgres': 'django.db.backends.postgresql',
+    'postgresql': 'django.db.backends.postgresql',
+    'sqlite': 'django.db.backends.sqlite3',
+}
+
+
+def _integer(environ, name, default):
+    try:
+        return int(environ.get(name, default))
+    except ValueError:
+        raise ImproperlyConfigured(f'{name} doit être un entier.')
+
+
+def sqlite_database(name, environ=None):
+    """Base SQLite, avec le profil réglé si SQLITE_TUNED=1"""
+    environ = {} if environ is None else environ
+    database = {'ENGINE': ENGINES['sqlite'], 'NAME': name}
+    if environ.get('SQLITE_TUNED', '0') == '1':
+        pragmas = [
+            'journal_mode=WAL',
+            'synchronous=NORMAL',
+            f"mmap_size={_integer(environ, 'SQLITE_MMAP_SIZE', 256 * 1024 * 1024)}",
+            # Négatif : taille en Kio plutôt qu'en pages
+            f"cache_size=-{_integer(environ, 'SQLITE_CACHE_KB', 64 * 1024)}",
+            'temp_store=MEMORY',
+        ]
+        database['OPTIONS'] = {
+            'init_command': ';'.join(f'PRAGMA {pragma}' for pragma in pragmas),
+            'timeout': _integer(environ, 'SQLITE_BUSY_TIMEOUT', 5000) / 1000,
+            'transaction_mode': 'IMMEDIATE',
+        }
+    return database
+
+
+def database_from_url(url, environ=None):
+    """Dictionnaire DATABASES['default'] correspondant à ``url``"""
+    environ = {} if environ is None else environ
+    parts = urlsplit(url)
+    if parts.scheme not in ENGINES:
+        raise ImproperlyConfigured(f'DATABASE_URL : schéma {parts.scheme!r} non pris en charge.')
+
+    if parts.scheme == 'sqlite':
+        return sqlite_database(unquote(parts.path[1:]) or ':memory:', environ)
+
+    options = dict(parse_qsl(parts.query))
+    database = {
+        'ENGINE': ENGINES[parts.scheme],
+        'NAME': unquote(parts.path.lstrip('/')),
+        'USER': unquote(parts.username or ''),
+        'PASSWORD': unquote(parts.password or ''),
+        'HOST': parts.hostname or '',
+        'PORT': str(parts.port or ''),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': options,
+    }
+    if environ.get('DATABASE_POOL', '1') == '1':
+        # Le pool remplace les connexions persistantes (CONN_MAX_AGE doit valoir 0)
+        max_size = _integer(environ, 'DATABASE_POOL_MAX_SIZE', _integer(environ, 'WEB_THREADS', 4))
+        options['pool'] = {
+            'min_size': min(_integer(environ, 'DATABASE_POOL_MIN_SIZE', 2), max_size),
+            'max_size': max_size,
+            # Attente maximale d'une connexion libre avant erreur (s)
+            'timeout': _integer(environ, 'DATABASE_POOL_TIMEOUT', 10),
+        }
+        database['CONN_MAX_AGE'] = 0
+    else:
+        database['CONN_MAX_AGE'] = _integer(environ, 'DATABASE_CONN_MAX_AGE', 600)
+    return database
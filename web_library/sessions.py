@@ -0,0 +1,34 @@
+"""Stockage des sessions choisi par SESSION_STORE.
+
+- ``db`` : table ``django_session``, lue à chaque requête authentifiée ;
+- ``cached_db`` : même table, mais lue dans le cache ``sessions`` tant que
+  l'entrée y est ; seules la connexion, la déconnexion et les modifications
+  de la session écrivent encore en base. Le cache doit être partagé par tous
+  les processus (Redis, ``REDIS_URL``) : avec le cache mémoire local, une
+  déconnexion traitée par un worker laisse la session valide dans le cache
+  des autres, d'où ``cached_db`` par défaut seulement avec Redis (ou un seul
+  worker, ``WEB_WORKERS=1``) ;
+- ``signed_cookies`` : session entière dans un cookie signé par SECRET_KEY,
+  aucune requête SQL. Réservé aux petites sessions (identifiant de
+  l'utilisateur) ; une session ne peut pas être révoquée côté serveur avant
+  son expiration, hormis par un changement de mot de passe ou de SECRET_KEY.
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+
+def session_engine(environ=None):
+    """SESSION_ENGINE correspondant à SESSION_STORE"""
+    environ = {} if environ is None else environ
+    default = 'cached_db' if environ.get('REDIS_URL') else 'db'
+    store = environ.get('SESSION_STORE') or default
+    if store not in SESSION_ENGINES:
+        raise ImproperlyConfigured(
+            f"SESSION_STORE : {store!r} inconnu (choix : {', '.join(SESSION_ENGINES)})."
+        )
+    return SESSION_ENGINES[store]
@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .database import database_from_url, sqlite_database
+from .sessions import session_engine
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -41,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Profilage par requête (inactif tant que REQUEST_PROFILER_SAMPLE_RATE vaut 0)
+    'website.middleware.RequestProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,11 +79,15 @@ WSGI_APPLICATION = 'web_library.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# PostgreSQL (pool de connexions) ou autre base si DATABASE_URL est défini,
+# SQLite local sinon (profil réglé avec SQLITE_TUNED=1) ; voir
+# web_library/database.py
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': (
+        database_from_url(os.environ['DATABASE_URL'], os.environ)
+        if os.environ.get('DATABASE_URL')
+        else sqlite_database(BASE_DIR / 'db.sqlite3', os.environ)
+    ),
 }
 
 
@@ -117,12 +127,127 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Fichiers envoyés (couvertures et leurs miniatures)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Utilisateur et profil (rôle) lus en une requête ; ModelBackend reste
+# listé pour les sessions ouvertes avant ce changement
+AUTHENTICATION_BACKENDS = [
+    'website.backends.ProfileModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 # Login URLs
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
+
+# Passage automatique des emprunts en retard (en secondes, None = désactivé)
+# En production multi-serveurs, préférer un cron : python manage.py mark_overdue_loans
+OVERDUE_SWEEP_INTERVAL = None
+
+# Durée de vie maximale (en secondes) de l'instantané des statistiques du tableau de bord
+LIBRARY_STATS_TTL = 60
+
+# Durée de vie (en secondes) des classements « les plus empruntés » sur une période
+POPULAR_BOOKS_TTL = 600
+
+# Durée de vie (en secondes) des choix de filtres de l'admin lus en base (catégories)
+ADMIN_FILTER_CHOICES_TTL = 600
+
+# Âge (en jours depuis le retour) à partir duquel un emprunt rendu passe dans
+# l'archive (commande archive_loans)
+LOAN_ARCHIVE_AFTER_DAYS = 365
+
+# Backend de recherche plein texte du catalogue (None = choisi d'après la base :
+# FTS5 pour SQLite, tsvector/GIN pour PostgreSQL, icontains sinon)
+BOOK_SEARCH_BACKEND = None
+
+# Cache partagé : Redis si REDIS_URL est défini (plusieurs workers ou
+# serveurs, nécessite le paquet redis), sinon cache mémoire propre à chaque
+# processus
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'KEY_PREFIX': 'library',
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'KEY_PREFIX': 'library-sessions',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'library',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'library-sessions',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        },
+    }
+
+# Sessions : base (db), base lue via le cache « sessions » (cached_db, défaut
+# avec REDIS_URL) ou cookie signé (signed_cookies), selon SESSION_STORE ; voir
+# web_library/sessions.py. Le cache des sessions est séparé pour qu'un
+# cache.clear() ou l'éviction des pages du catalogue ne déconnecte personne
+SESSION_ENGINE = session_engine(os.environ)
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Messages flash dans un cookie seulement : jamais de lecture ni d'écriture
+# de la session pour un messages.success() (les plus anciens sont abandonnés
+# si le cookie dépasse 4 Ko)
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Durée de fraîcheur (secondes) des pages et fragments du catalogue en cache ;
+# toute écriture sur les livres ou les emprunts les invalide immédiatement
+CATALOGUE_CACHE_TTL = 300
+
+# L'invalidation ne touche que le cache du processus qui écrit : sans Redis,
+# plusieurs workers (WEB_WORKERS > 1) serviraient chacun leur copie périmée
+# jusqu'à CATALOGUE_CACHE_TTL. Le cache du catalogue n'est donc actif qu'avec
+# REDIS_URL ou un seul worker (runserver, WEB_WORKERS=1)
+CATALOGUE_CACHE_ENABLED = bool(os.environ.get('REDIS_URL')) or int(os.environ.get('WEB_WORKERS') or 1) <= 1
+
+# Profilage des requêtes (en-tête Server-Timing et logs « website.profiler »)
+# Fraction des requêtes profilées : 0 = désactivé, 1 = toutes (développement)
+REQUEST_PROFILER_SAMPLE_RATE = 0
+# Au-delà de ces seuils, la requête est journalisée en WARNING avec son SQL le plus lent
+REQUEST_PROFILER_MAX_QUERIES = 50
+REQUEST_PROFILER_SLOW_MS = 500
+
+# Processus dédiés au redimensionnement des couvertures (0 = dans la requête)
+THUMBNAIL_WORKERS = 2
+
+# Vues asynchrones pour les pages de consultation (website/async_views.py) ;
+# uniquement derrière un serveur ASGI (profil SERVER=asgi du Dockerfile)
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '0') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'website.profiler': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
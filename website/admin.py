@@ -1,7 +1,105 @@
+"""Administration Django, réglée pour de grandes tables.
+
+Les listes (changelists) d'emprunts et de livres restent bornées quel que
+soit le volume :
+
+- objets liés chargés par jointure (``list_select_related``) ;
+- nombre de résultats borné (``EstimatedCountPaginator``) et total de la
+  table non recompté à chaque filtre (``show_full_result_count = False``) ;
+- filtres sans requête de construction (statut, dates) ou à choix en cache
+  (catégories) ; pas de ``date_hierarchy``, qui lit les dates de toute la
+  table ;
+- retard calculé en SQL et recherche par index (préfixe, plein texte).
+"""
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from .models import UserProfile, Book, Loan
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connection
+from django.db.models import BooleanField, Case, ExpressionWrapper, Q, Value, When
+from django.db.models.functions import Now
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .models import ArchivedLoan, UserProfile, Book, Loan
+from .autocomplete import search_books, search_users
+from .signals import rows_updated
+
+# Au-delà, le nombre de résultats d'une liste filtrée n'est plus compté
+ADMIN_COUNT_LIMIT = 10000
+
+ADMIN_CATEGORIES_CACHE_KEY = 'website:admin_categories'
+
+
+def estimated_count(model):
+    """Nombre de lignes de la table d'après les statistiques de la base, ou None
+
+    ``reltuples`` sous PostgreSQL (VACUUM/ANALYZE), ``sqlite_stat1`` sous
+    SQLite (ANALYZE) : une lecture du catalogue au lieu d'un COUNT(*).
+    """
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql, params = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table]
+    elif connection.vendor == 'sqlite':
+        sql, params = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table]
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:
+        # Statistiques jamais calculées (table sqlite_stat1 absente)
+        return None
+    if row is None:
+        return None
+    count = int(str(row[0]).split()[0])
+    return count if count >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginateur de l'admin qui ne compte jamais plus de ADMIN_COUNT_LIMIT lignes
+
+    Le comptage s'arrête à la limite (COUNT sur une sous-requête LIMIT) ; au-delà,
+    la table entière non filtrée prend l'estimation de la base, une liste
+    filtrée affiche la limite (et autant de pages).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        count = queryset.order_by().values('pk')[:ADMIN_COUNT_LIMIT + 1].count()
+        if count <= ADMIN_COUNT_LIMIT:
+            return count
+        if not queryset.query.where:
+            return max(estimated_count(queryset.model) or 0, ADMIN_COUNT_LIMIT)
+        return ADMIN_COUNT_LIMIT
+
+
+class CategoryListFilter(admin.SimpleListFilter):
+    """Catégories du catalogue, lues une fois par ADMIN_FILTER_CHOICES_TTL
+
+    La catégorie est un texte libre : le filtre par défaut relirait les
+    valeurs distinctes de toute la table à chaque affichage de la liste.
+    """
+    title = 'catégorie'
+    parameter_name = 'category'
+
+    def lookups(self, request, model_admin):
+        categories = cache.get(ADMIN_CATEGORIES_CACHE_KEY)
+        if categories is None:
+            categories = list(
+                Book.objects.exclude(category='').exclude(category__isnull=True).order_by('category')
+                .values_list('category', flat=True).distinct()
+            )
+            cache.set(ADMIN_CATEGORIES_CACHE_KEY, categories, getattr(settings, 'ADMIN_FILTER_CHOICES_TTL', 600))
+        return [(category, category) for category in categories]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(category=self.value())
+        return queryset
 
 
 # Inline pour le profil utilisateur
@@ -17,10 +115,19 @@ class UserAdmin(BaseUserAdmin):
     inlines = (UserProfileInline,)
     list_display = ('username', 'email', 'first_name', 'last_name', 'get_user_type', 'is_staff')
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'profile__user_type')
+    list_select_related = ('profile',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     def get_user_type(self, obj):
         return obj.profile.get_user_type_display() if hasattr(obj, 'profile') else '-'
     get_user_type.short_description = 'Type d\'utilisateur'
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Recherche par préfixe indexée (liste et autocomplétion des emprunts)
+        if not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        return search_users(queryset, search_term), False
 
 
 # Réenregistrer UserAdmin
@@ -35,6 +142,7 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_filter = ('user_type', 'created_at')
     search_fields = ('user__username', 'user__email', 'user__first_name', 'user__last_name', 'matricule')
     readonly_fields = ('created_at', 'updated_at')
+    list_select_related = ('user',)
     
     fieldsets = (
         ('Utilisateur', {
@@ -54,10 +162,16 @@ class UserProfileAdmin(admin.ModelAdmin):
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
     list_display = ('title', 'author', 'isbn', 'category', 'quantity', 'available_quantity', 'status', 'created_at')
-    list_filter = ('status', 'category', 'publication_year', 'created_at')
+    # Pas de filtre sur publication_year : ses choix reliraient toute la table
+    list_filter = ('status', CategoryListFilter, 'created_at')
     search_fields = ('title', 'author', 'isbn', 'publisher', 'category')
     readonly_fields = ('created_at', 'updated_at', 'added_by')
-    list_editable = ('status',)
+    # Statut changé par actions (un UPDATE pour toute la sélection) plutôt que
+    # par list_editable : un formulaire par ligne à afficher, un save() par
+    # ligne à l'envoi, au risque d'écraser un emprunt en cours
+    actions = ('mark_maintenance', 'mark_lost', 'mark_in_service')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Informations principales', {
@@ -75,6 +189,32 @@ class BookAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_search_results(self, request, queryset, search_term):
+        # ISBN ou index plein texte plutôt que LIKE '%...%' sur chaque colonne
+        if not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        return search_books(queryset, search_term), False
+    
+    def _set_status(self, request, queryset, status):
+        updated = queryset.update(status=status, updated_at=timezone.now())
+        rows_updated.send(sender=Book)
+        self.message_user(request, f'{updated} livre(s) mis à jour.')
+    
+    @admin.action(description='Mettre en maintenance')
+    def mark_maintenance(self, request, queryset):
+        self._set_status(request, queryset, 'MAINTENANCE')
+    
+    @admin.action(description='Déclarer perdus')
+    def mark_lost(self, request, queryset):
+        self._set_status(request, queryset, 'LOST')
+    
+    @admin.action(description='Remettre en service')
+    def mark_in_service(self, request, queryset):
+        # Emprunté si tous les exemplaires sont sortis, comme borrow_book()
+        self._set_status(request, queryset, Case(
+            When(available_quantity__lte=0, then=Value('BORROWED')), default=Value('AVAILABLE'),
+        ))
+    
     def save_model(self, request, obj, form, change):
         if not change:  # Si c'est une création
             obj.added_by = request.user
@@ -87,10 +227,18 @@ class BookAdmin(admin.ModelAdmin):
 @admin.register(Loan)
 class LoanAdmin(admin.ModelAdmin):
     list_display = ('book', 'borrower', 'borrow_date', 'due_date', 'return_date', 'status', 'is_overdue_display')
+    # Choix fixes (statut, périodes) : aucune requête pour construire les filtres
     list_filter = ('status', 'borrow_date', 'due_date')
     search_fields = ('book__title', 'borrower__username', 'borrower__first_name', 'borrower__last_name')
     readonly_fields = ('created_at', 'updated_at', 'librarian', 'is_overdue_display', 'days_overdue')
-    date_hierarchy = 'borrow_date'
+    list_select_related = ('book', 'borrower')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Les requêtes de la liste prennent quelques ms : le reste est le rendu
+    # des lignes, proportionnel à leur nombre
+    list_per_page = 50
+    # Recherche par préfixe au lieu de listes de tous les livres et utilisateurs
+    autocomplete_fields = ('book', 'borrower')
     
     fieldsets = (
         ('Informations d\'emprunt', {
@@ -108,10 +256,27 @@ class LoanAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        # Même règle que Loan.is_overdue, évaluée par la base pour toute la page
+        return super().get_queryset(request).annotate(overdue=ExpressionWrapper(
+            Q(status__in=['ACTIVE', 'OVERDUE'], due_date__lt=Now()), output_field=BooleanField()
+        ))
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Livre (ISBN, plein texte) ou emprunteur (préfixes) cherchés par index,
+        # puis emprunts de ces livres ou emprunteurs
+        if not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        books = search_books(Book.objects.all(), search_term).order_by().values('pk')
+        borrowers = search_users(User.objects.all(), search_term).values('pk')
+        return queryset.filter(Q(book__in=books) | Q(borrower__in=borrowers)), False
+    
     def is_overdue_display(self, obj):
-        return "Oui" if obj.is_overdue() else "Non"
+        overdue = getattr(obj, 'overdue', None)
+        return obj.is_overdue() if overdue is None else overdue
     is_overdue_display.short_description = 'En retard'
     is_overdue_display.boolean = True
+    is_overdue_display.admin_order_field = 'overdue'
     
     def save_model(self, request, obj, form, change):
         if not change:  # Si c'est une création
@@ -119,6 +284,31 @@ class LoanAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+# Archive des emprunts rendus (website.archive), en lecture seule
+@admin.register(ArchivedLoan)
+class ArchivedLoanAdmin(admin.ModelAdmin):
+    list_display = ('id', 'book', 'borrower', 'borrow_date', 'due_date', 'return_date')
+    list_filter = ('borrow_date', 'return_date')
+    search_fields = ('borrower__username',)
+    list_select_related = ('book', 'borrower')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    raw_id_fields = ('book', 'borrower', 'librarian')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        borrowers = search_users(User.objects.all(), search_term).values('pk')
+        return queryset.filter(borrower__in=borrowers), False
+
+
 # Configuration du site admin
 admin.site.site_header = "Administration - Bibliothèque en Ligne"
 admin.site.site_title = "Bibliothèque Admin"
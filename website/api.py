@@ -0,0 +1,138 @@
+"""API JSON en lecture seule : catalogue, fiche d'un livre, disponibilités.
+
+Pensée pour les bornes et l'application mobile qui interrogent la
+disponibilité en boucle : pas de template, JSON compact, pagination par
+curseur, et validation conditionnelle. Chaque réponse porte un ETag fort et
+un Last-Modified calculés à partir de ``Book.updated_at`` (mis à jour aussi
+par les emprunts et retours) ; un client qui renvoie If-None-Match ou
+If-Modified-Since reçoit un 304 sans que le JSON soit produit. L'ETag fait
+foi : Last-Modified, à la seconde près, ne voit pas un livre retiré d'une
+liste.
+"""
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_GET
+
+from .cache import make_key
+from .forms import BookSearchForm
+from .models import Book
+from .pagination import KeysetPaginator
+from .search import filter_books
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 100
+AVAILABILITY_MAX_IDS = 100
+
+# Champs lus pour la liste et la fiche ; la liste omet la description
+LIST_FIELDS = (
+    'id', 'isbn', 'title', 'author', 'category', 'publication_year',
+    'quantity', 'available_quantity', 'status', 'cover_image', 'cover_variants',
+    'created_at', 'updated_at',
+)
+DETAIL_FIELDS = LIST_FIELDS + ('publisher', 'description')
+AVAILABILITY_FIELDS = ('id', 'available_quantity', 'status', 'updated_at')
+
+
+def availability_data(book):
+    return {
+        'id': book.pk,
+        'available_quantity': book.available_quantity,
+        'status': book.status,
+        'updated_at': book.updated_at,
+    }
+
+
+def book_data(book, detail=False):
+    data = {
+        'id': book.pk,
+        'isbn': book.isbn,
+        'title': book.title,
+        'author': book.author,
+        'category': book.category,
+        'publication_year': book.publication_year,
+        'quantity': book.quantity,
+        'available_quantity': book.available_quantity,
+        'status': book.status,
+        'cover': book.cover_thumbnail_url or None,
+        'updated_at': book.updated_at,
+    }
+    if detail:
+        data['publisher'] = book.publisher
+        data['description'] = book.description
+    return data
+
+
+def conditional_json(request, books, payload, extra_key=''):
+    """JSON de ``payload()``, ou 304 si le client a déjà cette version
+
+    L'ETag couvre l'id et le updated_at de chaque livre renvoyé (plus
+    ``extra_key`` : curseurs, filtres) ; il change dès qu'un livre de la
+    réponse est modifié, ajouté ou retiré.
+    """
+    etag = quote_etag(make_key(extra_key, *[(book.pk, book.updated_at.isoformat()) for book in books]))
+    last_modified = max((book.updated_at for book in books), default=None)
+    # À la seconde près, comme l'en-tête HTTP
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(payload(), json_dumps_params={'separators': (',', ':'), 'ensure_ascii': False})
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    # Le client peut garder la réponse mais doit la revalider à chaque fois
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _page_size(request):
+    try:
+        return min(max(int(request.GET.get('limit', API_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+    except ValueError:
+        return API_PAGE_SIZE
+
+
+@require_GET
+def api_books(request):
+    """Catalogue paginé par curseur, avec les filtres de la liste des livres"""
+    form = BookSearchForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    books = filter_books(Book.objects.only(*LIST_FIELDS), **form.cleaned_data)
+    ordering = ('search_rank', 'id') if 'search_rank' in books.query.annotations else ('-created_at', '-id')
+    page = KeysetPaginator(books, ordering, _page_size(request)).page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return conditional_json(
+        request,
+        page.object_list,
+        lambda: {
+            'results': [book_data(book) for book in page],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        },
+        extra_key=(page.next_cursor, page.previous_cursor),
+    )
+
+
+@require_GET
+def api_book_detail(request, pk):
+    """Fiche d'un livre"""
+    book = Book.objects.only(*DETAIL_FIELDS).filter(pk=pk).first()
+    if book is None:
+        raise Http404
+    return conditional_json(request, [book], lambda: book_data(book, detail=True))
+
+
+@require_GET
+def api_availability(request):
+    """Disponibilité de plusieurs livres : ``?ids=1,2,3`` (100 au plus)"""
+    try:
+        ids = sorted({int(value) for value in request.GET.get('ids', '').split(',') if value.strip()})
+    except ValueError:
+        return JsonResponse({'errors': {'ids': ['Liste d\'identifiants invalide.']}}, status=400)
+    if not ids or len(ids) > AVAILABILITY_MAX_IDS:
+        return JsonResponse({'errors': {'ids': [f'Entre 1 et {AVAILABILITY_MAX_IDS} identifiants.']}}, status=400)
+    books = list(Book.objects.only(*AVAILABILITY_FIELDS).filter(pk__in=ids).order_by('id'))
+    return conditional_json(request, books, lambda: {'results': [availability_data(book) for book in books]})
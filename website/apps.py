@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class WebsiteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'website'
+
+    def ready(self):
+        from . import autocomplete, cache, search, stats, thumbnails  # noqa: F401 (connecte les signaux)
+
+        interval = getattr(settings, 'OVERDUE_SWEEP_INTERVAL', None)
+        if interval:
+            from .scheduler import is_serving_process, start_overdue_sweeper
+            if is_serving_process():
+                start_overdue_sweeper(interval)
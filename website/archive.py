@@ -0,0 +1,88 @@
+"""Archivage des emprunts rendus (commande archive_loans).
+
+La table des emprunts ne garde que les emprunts en cours et les retours
+récents : c'est elle que lisent l'emprunt, « Mes emprunts », le tableau de
+bord et le passage en retard. Les emprunts rendus depuis plus de
+LOAN_ARCHIVE_AFTER_DAYS jours passent dans ``ArchivedLoan`` par lots :
+chaque lot est copié (INSERT ... SELECT) puis supprimé dans la même
+transaction, sans charger les lignes en Python.
+
+Les lectures de l'historique passent par les deux tables : ``loan_history``
+pour « Mes emprunts » et ``loan_querysets`` pour la liste des emprunts
+(pagination fusionnée) et les exports.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ArchivedLoan, Loan
+from .signals import rows_updated
+
+ARCHIVE_BATCH_SIZE = 5000
+
+
+def archive_cutoff(now=None, days=None):
+    """Date de retour avant laquelle un emprunt est archivé"""
+    days = getattr(settings, 'LOAN_ARCHIVE_AFTER_DAYS', 365) if days is None else days
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def _move_sql(size):
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in ArchivedLoan._meta.concrete_fields)
+    placeholders = ', '.join(['%s'] * size)
+    archive = connection.ops.quote_name(ArchivedLoan._meta.db_table)
+    loans = connection.ops.quote_name(Loan._meta.db_table)
+    return (
+        f'INSERT INTO {archive} ({columns}) SELECT {columns} FROM {loans} WHERE id IN ({placeholders})',
+        f'DELETE FROM {loans} WHERE id IN ({placeholders})',
+    )
+
+
+def archive_returned_loans(days=None, batch_size=ARCHIVE_BATCH_SIZE, pause=0, progress=None):
+    """Déplace les emprunts rendus avant la date limite ; retourne leur nombre
+
+    Une transaction par lot de ``batch_size`` emprunts : une interruption
+    perd au plus le lot en cours, qu'un nouveau passage reprend.
+    ``progress(archived)`` est appelé après chaque lot.
+    """
+    cutoff = archive_cutoff(days=days)
+    # borrow_date <= return_date : la condition redondante sur borrow_date
+    # permet de parcourir l'index (status, borrow_date)
+    candidates = Loan.objects.filter(status='RETURNED', borrow_date__lt=cutoff, return_date__lt=cutoff).order_by()
+    archived = 0
+    while True:
+        with transaction.atomic():
+            ids = list(candidates.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            insert, delete = _move_sql(len(ids))
+            with connection.cursor() as cursor:
+                cursor.execute(insert, ids)
+                cursor.execute(delete, ids)
+            rows_updated.send(sender=Loan)
+        archived += len(ids)
+        if progress:
+            progress(archived)
+        if len(ids) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return archived
+
+
+def loan_history(borrower):
+    """Emprunts rendus d'un lecteur : table des emprunts puis archive, livre joint"""
+    return [
+        Loan.objects.filter(borrower=borrower, status='RETURNED').select_related('book'),
+        ArchivedLoan.objects.filter(borrower=borrower).select_related('book'),
+    ]
+
+
+def loan_querysets(status=None):
+    """Tables à lire pour un statut ; l'archive ne contient que des emprunts rendus"""
+    if status and status != 'RETURNED':
+        return [Loan.objects.all()]
+    return [Loan.objects.all(), ArchivedLoan.objects.all()]
@@ -0,0 +1,92 @@
+"""Variantes asynchrones des pages publiques les plus consultées.
+
+Accueil, catalogue, fiche d'un livre et « Mes emprunts » : mêmes templates,
+mêmes clés de cache et même contenu que dans views.py, mais les requêtes
+passent par l'ORM asynchrone (``acount``, ``aget``, ``async for``). Servies
+par un serveur ASGI (uvicorn), ces vues n'occupent pas un worker pendant
+qu'un client lent envoie sa requête ou lit la réponse : quelques processus
+tiennent des centaines de connexions ouvertes.
+
+Elles remplacent les vues synchrones dans urls.py quand ASYNC_VIEWS est
+activé (variable DJANGO_ASYNC_VIEWS=1, profil SERVER=asgi du Dockerfile). Sous
+WSGI, Django créerait une boucle d'événements par requête : on les laisse
+désactivées. L'ORM asynchrone de Django exécute toujours les requêtes SQL
+dans un thread ; le gain porte sur les connexions lentes ou inactives, pas
+sur le débit brut (voir la commande loadtest).
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import aget_object_or_404, render
+
+from .archive import loan_history
+from .cache import CATALOGUE, aget_or_compute, make_key
+from .forms import BookSearchForm
+from .models import Book, Loan
+from .pagination import apaginate, link_queries
+from .search import filter_books
+from .views import BOOK_LIST_PARAMS, BOOKS_PER_PAGE, LOANS_PER_PAGE
+
+
+async def _render(request, template_name, context):
+    # Le rendu lit l'utilisateur, la session et les messages (accès
+    # synchrones) : il s'exécute dans le thread de la requête
+    return await sync_to_async(render)(request, template_name, context)
+
+
+async def home(request):
+    """Page d'accueil"""
+    async def compute():
+        available = Book.objects.filter(status='AVAILABLE')
+        return {
+            'recent_books': [book async for book in available[:6]],
+            'total_books': await Book.objects.acount(),
+            'available_books': await available.acount(),
+        }
+
+    context = await aget_or_compute(CATALOGUE, 'home', compute)
+    return await _render(request, 'website/home.html', context)
+
+
+async def book_list(request):
+    """Liste de tous les livres avec recherche"""
+    form = BookSearchForm(request.GET)
+
+    async def search():
+        books = Book.objects.all()
+        if form.is_valid():
+            books = filter_books(books, **form.cleaned_data)
+
+        if 'search_rank' in books.query.annotations:
+            return await apaginate(request, books, ('search_rank', 'id'), BOOKS_PER_PAGE, links=False)
+        return await apaginate(request, books, ('-created_at', '-id'), BOOKS_PER_PAGE, links=False)
+
+    page_key = make_key(*(request.GET.get(name, '') for name in BOOK_LIST_PARAMS))
+    books = link_queries(request, await aget_or_compute(CATALOGUE, f'book_list:{page_key}', search))
+
+    context = {
+        'books': books,
+        'form': form,
+        'page_key': page_key,
+    }
+    return await _render(request, 'website/book_list.html', context)
+
+
+async def book_detail(request, pk):
+    """Détails d'un livre"""
+    book = await aget_object_or_404(Book, pk=pk)
+    return await _render(request, 'website/book_detail.html', {'book': book})
+
+
+@login_required
+async def my_loans(request):
+    """Mes emprunts en cours et historique"""
+    user = await request.auser()
+    loans = Loan.objects.filter(borrower=user).select_related('book')
+    active_loans = [loan async for loan in loans.filter(status__in=['ACTIVE', 'OVERDUE'])]
+    past_loans = await apaginate(request, loan_history(user), ('-borrow_date', '-id'), LOANS_PER_PAGE)
+
+    context = {
+        'active_loans': active_loans,
+        'past_loans': past_loans,
+    }
+    return await _render(request, 'website/my_loans.html', context)
@@ -0,0 +1,99 @@
+"""Recherche par préfixe pour les champs livre et emprunteur (autocomplétion).
+
+Remplace les listes déroulantes de toute la table (LoanForm, LoanAdmin) :
+chaque frappe interroge un point d'accès JSON qui renvoie au plus
+AUTOCOMPLETE_MAX_LIMIT résultats, lus par index :
+
+- livres : ISBN (chiffres seuls) par intervalle sur l'index unique de
+  ``isbn``, sinon recherche plein texte en préfixe (titre, auteur,
+  catégorie) ; un nombre court (« 1984 ») est cherché des deux façons ;
+- emprunteurs : nom d'utilisateur, prénom, nom ou matricule, par préfixe
+  sur les clés normalisées du profil (minuscules sans accents,
+  ``UserProfile.*_key``) ; chaque mot saisi doit commencer l'un de ces
+  champs. Les utilisateurs sans profil ne sont pas proposés.
+
+La saisie est normalisée en Python comme les clés : « élo » trouve
+« Élodie », ce que LOWER() ne permet pas sous SQLite (ASCII seulement).
+"""
+import re
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .importer import ISBN_NOISE
+from .models import UserProfile
+from .search import get_search_backend, normalize
+
+AUTOCOMPLETE_LIMIT = 20
+AUTOCOMPLETE_MAX_LIMIT = 50
+# Les requêtes plus courtes correspondraient à trop de lignes
+MIN_TERM_LENGTH = 2
+ISBN_PREFIX = re.compile(r'\d{3,12}[\dX]?')
+# Début d'ISBN-13 (978, 979) ou 10 caractères et plus : ne peut être qu'un ISBN ;
+# un nombre plus court peut aussi être un titre (« 1984 », « 2001 »)
+ISBN_ONLY = re.compile(r'97[89]\d*[\dX]?|\d{9,12}[\dX]')
+# Champs de auth_user recopiés dans les clés du profil
+USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def prefix_range(field, prefix):
+    """Filtre « commence par » qui passe par l'index du champ
+
+    SQLite (collation binaire) : intervalle ``champ >= 'abc' AND champ < 'abd'``,
+    LIKE n'y utilisant pas d'index. PostgreSQL : ``LIKE 'abc%'``, servi par
+    l'index ``*_like`` (varchar_pattern_ops) que Django crée pour les champs
+    texte indexés ; l'intervalle y suivrait la collation de la base (fr_FR...)
+    et non l'ordre des octets.
+    """
+    if connection.vendor == 'postgresql':
+        return Q(**{f'{field}__startswith': prefix})
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix[:-1] + chr(ord(prefix[-1]) + 1)})
+
+
+def search_books(queryset, term):
+    """Livres dont l'ISBN ou un mot du titre, de l'auteur ou de la catégorie commence par ``term``"""
+    isbn = ISBN_NOISE.sub('', term.upper())
+    if ISBN_PREFIX.fullmatch(isbn):
+        if ISBN_ONLY.fullmatch(isbn):
+            return queryset.filter(prefix_range('isbn', isbn)).order_by('isbn')
+        # Nombre court : ISBN ou mot du titre, de l'auteur ou de la catégorie
+        by_text = get_search_backend().search(queryset, term).order_by().values('pk')
+        return queryset.filter(prefix_range('isbn', isbn) | Q(pk__in=by_text)).order_by('isbn')
+    return get_search_backend().search(queryset, term).order_by('search_rank', 'id')
+
+
+def search_users(queryset, term):
+    """Utilisateurs dont chaque mot de ``term`` commence un nom, prénom, identifiant ou matricule
+
+    Chaque mot est cherché dans les clés normalisées du profil, un préfixe
+    par index (OR d'index), dans une sous-requête sur les profils.
+    """
+    for word in normalize(term).split():
+        profiles = UserProfile.objects.filter(
+            Q(*[prefix_range(key, word) for key in UserProfile.SEARCH_KEYS], _connector=Q.OR)
+        )
+        queryset = queryset.filter(pk__in=profiles.values('user_id'))
+    return queryset
+
+
+def book_label(book):
+    return f'{book.title} - {book.author} ({book.isbn})'
+
+
+def borrower_label(user):
+    name = user.get_full_name() or user.username
+    profile = getattr(user, 'profile', None)
+    return f'{name} ({user.username}, {profile.matricule})' if profile and profile.matricule else f'{name} ({user.username})'
+
+
+@receiver(post_save, sender=User)
+def _update_search_keys(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Les connexions n'enregistrent que last_login : rien à recalculer
+    if raw or (update_fields is not None and not set(update_fields) & set(USER_FIELDS)):
+        return
+    UserProfile.objects.filter(user=instance).update(
+        **{f'{field}_key': normalize(getattr(instance, field)) for field in USER_FIELDS}
+    )
@@ -0,0 +1,31 @@
+"""Backend d'authentification qui charge le profil avec l'utilisateur.
+
+Chaque requête authentifiée relit l'utilisateur de la session ; les
+vérifications de rôle (``is_librarian``, ``can_borrow``) et base.html lisent
+ensuite ``user.profile``. En joignant le profil dès cette lecture
+(``select_related``), le rôle ne coûte plus aucune requête, et un compte sans
+profil est connu sans requête non plus (``hasattr(user, 'profile')`` est faux).
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class ProfileModelBackend(ModelBackend):
+    """ModelBackend dont get_user() renvoie l'utilisateur et son profil en une requête"""
+
+    def _users(self):
+        return get_user_model()._default_manager.select_related('profile')
+
+    def get_user(self, user_id):
+        try:
+            user = self._users().get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        try:
+            user = await self._users().aget(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
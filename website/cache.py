@@ -0,0 +1,200 @@
+"""Cache versionné des pages publiques (accueil, catalogue).
+
+Chaque espace de noms a un numéro de génération gardé dans le cache, et
+toutes ses clés l'incluent : invalider revient à incrémenter la génération
+(une seule écriture, les anciennes entrées expirent d'elles-mêmes). La
+génération ``catalogue`` change après chaque écriture validée sur les livres
+ou les emprunts.
+
+Protection contre les rafales de recalcul : une entrée est conservée au-delà
+de sa durée de fraîcheur. Une fois périmée, un seul worker (verrou posé avec
+``cache.add``) la recalcule pendant que les autres servent encore l'ancienne
+valeur ; si l'entrée n'existe pas du tout, les autres attendent brièvement le
+résultat au lieu de lancer le même calcul.
+
+Les compteurs (hit, stale, wait, miss) sont tenus dans le cache lui-même pour
+être partagés entre workers ; voir ``cache_stats()`` et la commande
+``cache_stats``.
+
+Le cache doit être partagé par tous les workers (Redis) : avec le cache
+mémoire propre à chaque processus, une écriture n'invaliderait que la copie
+du worker qui l'a faite. Sans Redis et avec plusieurs workers,
+CATALOGUE_CACHE_ENABLED est faux et chaque page est calculée à la demande.
+"""
+import asyncio
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Book, Loan
+from .signals import rows_updated
+
+CATALOGUE = 'catalogue'
+
+EVENTS = ('hit', 'stale', 'wait', 'miss')
+
+# Durée maximale d'un recalcul (verrou) et pas d'attente des autres workers
+LOCK_TIMEOUT = 10
+WAIT_STEP = 0.05
+WAIT_LIMIT = 2
+
+
+def make_key(*parts):
+    """Clé courte et sûre (memcached) à partir de valeurs quelconques"""
+    return hashlib.md5('\x1f'.join(map(str, parts)).encode(), usedforsecurity=False).hexdigest()
+
+
+def _generation_key(namespace):
+    return f'website:gen:{namespace}'
+
+
+def generation(namespace):
+    """Génération courante d'un espace de noms"""
+    key = _generation_key(namespace)
+    value = cache.get(key)
+    if value is None:
+        # Valeur de départ unique : une génération évincée du cache ne peut
+        # pas retomber sur un numéro déjà utilisé
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key)
+    return value
+
+
+def bump_generation(namespace):
+    """Invalide d'un coup toutes les entrées d'un espace de noms"""
+    try:
+        cache.incr(_generation_key(namespace))
+    except ValueError:
+        generation(namespace)
+
+
+def invalidate(namespace):
+    """Change la génération une fois la transaction en cours validée"""
+    transaction.on_commit(lambda: bump_generation(namespace))
+
+
+def _count(namespace, event):
+    key = f'website:cache_stats:{namespace}:{event}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def cache_stats(namespace=CATALOGUE):
+    """Compteurs hit/stale/wait/miss d'un espace de noms"""
+    keys = {f'website:cache_stats:{namespace}:{event}': event for event in EVENTS}
+    values = cache.get_many(keys)
+    return {event: values.get(key, 0) for key, event in keys.items()}
+
+
+def reset_cache_stats(namespace=CATALOGUE):
+    cache.delete_many([f'website:cache_stats:{namespace}:{event}' for event in EVENTS])
+
+
+def _full_key(namespace, key):
+    return f'website:{namespace}:{generation(namespace)}:{key}'
+
+
+def _lookup(full_key, namespace):
+    """Entrée servable tout de suite, ou None ; et verrou de recalcul obtenu ou non"""
+    entry = cache.get(full_key)
+    if entry is not None and time.time() < entry[0]:
+        _count(namespace, 'hit')
+        return entry, False
+
+    locked = cache.add(f'{full_key}:lock', 1, LOCK_TIMEOUT)
+    if not locked and entry is not None:
+        # Un autre worker recalcule déjà : l'ancienne valeur fait l'affaire
+        _count(namespace, 'stale')
+        return entry, False
+    return None, locked
+
+
+def _timeout(timeout):
+    return getattr(settings, 'CATALOGUE_CACHE_TTL', 300) if timeout is None else timeout
+
+
+def _store(full_key, value, timeout):
+    cache.set(full_key, (time.time() + timeout, value), timeout * 2)
+
+
+def _release(full_key, locked):
+    if locked:
+        cache.delete(f'{full_key}:lock')
+
+
+def get_or_compute(namespace, key, compute, timeout=None):
+    """Valeur en cache pour ``key``, calculée par ``compute()`` si besoin
+
+    ``timeout`` est la durée de fraîcheur (défaut : CATALOGUE_CACHE_TTL) ;
+    l'entrée reste disponible autant de temps encore comme valeur de secours.
+    """
+    if not getattr(settings, 'CATALOGUE_CACHE_ENABLED', True):
+        return compute()
+    timeout = _timeout(timeout)
+    full_key = _full_key(namespace, key)
+    entry, locked = _lookup(full_key, namespace)
+    if entry is not None:
+        return entry[1]
+    if not locked:
+        deadline = time.monotonic() + WAIT_LIMIT
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_STEP)
+            entry = cache.get(full_key)
+            if entry is not None:
+                _count(namespace, 'wait')
+                return entry[1]
+        # Calcul trop long ou worker disparu : on calcule nous-mêmes
+
+    _count(namespace, 'miss')
+    try:
+        value = compute()
+        _store(full_key, value, timeout)
+    finally:
+        _release(full_key, locked)
+    return value
+
+
+async def aget_or_compute(namespace, key, compute, timeout=None):
+    """Variante asynchrone de ``get_or_compute`` : ``compute()`` est une coroutine
+
+    Les accès au cache passent par un thread (sync_to_async) et l'attente par
+    ``asyncio.sleep`` : la boucle d'événements n'est jamais bloquée.
+    """
+    if not getattr(settings, 'CATALOGUE_CACHE_ENABLED', True):
+        return await compute()
+    timeout = _timeout(timeout)
+    full_key = await sync_to_async(_full_key)(namespace, key)
+    entry, locked = await sync_to_async(_lookup)(full_key, namespace)
+    if entry is not None:
+        return entry[1]
+    if not locked:
+        deadline = time.monotonic() + WAIT_LIMIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(WAIT_STEP)
+            entry = await cache.aget(full_key)
+            if entry is not None:
+                await sync_to_async(_count)(namespace, 'wait')
+                return entry[1]
+
+    await sync_to_async(_count)(namespace, 'miss')
+    try:
+        value = await compute()
+        await sync_to_async(_store)(full_key, value, timeout)
+    finally:
+        await sync_to_async(_release)(full_key, locked)
+    return value
+
+
+@receiver([post_save, post_delete, rows_updated], sender=Book)
+@receiver([post_save, post_delete, rows_updated], sender=Loan)
+def _invalidate_catalogue(sender, **kwargs):
+    invalidate(CATALOGUE)
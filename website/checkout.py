@@ -0,0 +1,333 @@
+"""Emprunts et retours en série (rentrée, vidage de la boîte de retour).
+
+Emprunts : chaque ligne du lot désigne un livre par son ISBN (scanné ou saisi)
+et, éventuellement, le lecteur (nom d'utilisateur ou matricule) ; sans
+lecteur, la ligne va au lecteur par défaut du formulaire. Le lot est traité
+en un nombre fixe de requêtes, quelle que soit sa taille :
+
+- livres, lecteurs et emprunts déjà ouverts pour ces couples lus en une
+  requête chacun ;
+- exemplaires décomptés par des UPDATE ensemblistes (un par nombre
+  d'exemplaires demandés), gardés comme ``Book.borrow_book`` par le statut et
+  ``available_quantity >= n`` ;
+- emprunts insérés par ``bulk_create``.
+
+Retours : chaque ligne est un numéro d'emprunt, un ISBN, ou « ISBN lecteur ».
+Un ISBN seul désigne les emprunts ouverts de ce livre quand il y a au moins
+autant de scans que d'emprunts ouverts, sinon le lecteur doit être précisé.
+Les emprunts sont lus en une requête, passés à « Retourné » par un seul
+UPDATE, et les exemplaires rendus par des UPDATE ensemblistes (un par nombre
+d'exemplaires rendus), comme ``Book.return_book``.
+
+Chaque lot tient dans une transaction. Chaque ligne reçoit son résultat ;
+une ligne refusée n'empêche pas les autres.
+"""
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from itertools import zip_longest
+from typing import Optional
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .importer import ISBN_FORMAT, ImportRowError, normalize_isbn
+from .models import Book, Loan
+from .signals import rows_updated
+
+# Séparateurs acceptés entre l'ISBN et le lecteur sur une ligne
+LINE_SEPARATOR = re.compile(r'[\s,;]+')
+MAX_LINES = 500
+OPEN_STATUSES = ['ACTIVE', 'OVERDUE']
+
+
+class CheckoutConflict(Exception):
+    """Un livre ou un emprunt du lot a changé pendant son enregistrement"""
+
+
+@dataclass
+class CheckoutLine:
+    """Une ligne du lot et son résultat"""
+    number: int
+    text: str
+    isbn: str = ''
+    borrower_ref: str = ''
+    book: Optional[Book] = None
+    borrower: Optional[User] = None
+    loan: Optional[Loan] = None
+    error: str = ''
+
+    @property
+    def ok(self):
+        return self.loan is not None
+
+
+def parse_lines(text, default_borrower=''):
+    """Lignes du lot : « ISBN » ou « ISBN lecteur » (séparés par espace, virgule ou point-virgule)"""
+    lines = []
+    for number, raw in enumerate(text.splitlines(), start=1):
+        raw = raw.strip()
+        if not raw:
+            continue
+        parts = LINE_SEPARATOR.split(raw, maxsplit=1)
+        line = CheckoutLine(number=number, text=raw, borrower_ref=(parts[1:] or [default_borrower])[0].strip())
+        try:
+            line.isbn = normalize_isbn(parts[0])
+        except ImportRowError as exc:
+            line.error = str(exc)
+        else:
+            if not line.borrower_ref:
+                line.error = 'Lecteur manquant'
+        lines.append(line)
+    return lines
+
+
+def _resolve(lines):
+    """Livres et lecteurs des lignes, en une requête chacun"""
+    books = Book.objects.select_for_update().filter(isbn__in={line.isbn for line in lines})
+    books = {book.isbn: book for book in books}
+    refs = {line.borrower_ref for line in lines}
+    borrowers = {}
+    for user in User.objects.filter(Q(username__in=refs) | Q(profile__matricule__in=refs)).select_related('profile'):
+        borrowers[user.username] = user
+        profile = getattr(user, 'profile', None)
+        if profile and profile.matricule:
+            borrowers[profile.matricule] = user
+    for line in lines:
+        line.book = books.get(line.isbn)
+        line.borrower = borrowers.get(line.borrower_ref)
+        if line.book is None:
+            line.error = 'Livre inconnu'
+        elif line.borrower is None:
+            line.error = 'Lecteur inconnu'
+        elif not (hasattr(line.borrower, 'profile') and line.borrower.profile.can_borrow()):
+            line.error = 'Ce compte ne peut pas emprunter'
+
+
+def _allocate(lines):
+    """Attribue les exemplaires dans l'ordre des lignes ; retourne {livre: nombre}"""
+    open_pairs = set(Loan.objects.filter(
+        status__in=OPEN_STATUSES,
+        book__in={line.book.pk for line in lines},
+        borrower__in={line.borrower.pk for line in lines},
+    ).values_list('book_id', 'borrower_id'))
+    remaining = {line.book.pk: line.book.available_quantity if line.book.status == 'AVAILABLE' else 0 for line in lines}
+    demand = Counter()
+    for line in lines:
+        pair = (line.book.pk, line.borrower.pk)
+        if pair in open_pairs:
+            line.error = 'Déjà emprunté par ce lecteur'
+        elif remaining[line.book.pk] <= 0:
+            line.error = 'Plus d\'exemplaire disponible'
+        else:
+            open_pairs.add(pair)
+            remaining[line.book.pk] -= 1
+            demand[line.book.pk] += 1
+    return demand
+
+
+def _take_copies(demand, now):
+    """Décompte les exemplaires : un UPDATE par nombre d'exemplaires demandés"""
+    by_count = defaultdict(list)
+    for book_id, count in demand.items():
+        by_count[count].append(book_id)
+    for count, book_ids in by_count.items():
+        updated = Book.objects.filter(
+            pk__in=book_ids,
+            status='AVAILABLE',
+            available_quantity__gte=count,
+        ).update(
+            available_quantity=F('available_quantity') - count,
+            total_loans=F('total_loans') + count,
+            status=Case(
+                When(available_quantity=count, then=Value('BORROWED')),
+                default=F('status'),
+            ),
+            updated_at=now,
+        )
+        if updated != len(book_ids):
+            raise CheckoutConflict
+
+
+def bulk_checkout(lines, librarian, due_date, notes=None):
+    """Enregistre les lignes valides du lot dans une transaction
+
+    Complète chaque ligne (``loan`` ou ``error``) et retourne les emprunts
+    créés. Lève CheckoutConflict, sans rien enregistrer, si un livre a été
+    emprunté ailleurs entre la lecture du stock et son décompte.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        pending = [line for line in lines if not line.error]
+        if pending:
+            _resolve(pending)
+            pending = [line for line in pending if not line.error]
+        if pending:
+            demand = _allocate(pending)
+            pending = [line for line in pending if not line.error]
+        if not pending:
+            return []
+        _take_copies(demand, now)
+        # Échéance déjà passée : en retard d'emblée, comme Loan.save()
+        status = 'OVERDUE' if due_date < now else 'ACTIVE'
+        loans = Loan.objects.bulk_create([
+            Loan(book=line.book, borrower=line.borrower, librarian=librarian, borrow_date=now,
+                 due_date=due_date, status=status, notes=notes or None)
+            for line in pending
+        ])
+        for line, loan in zip(pending, loans):
+            line.loan = loan
+        # Pas de post_save : caches et statistiques à la main
+        rows_updated.send(sender=Book)
+        rows_updated.send(sender=Loan)
+    return loans
+
+
+@dataclass
+class ReturnLine:
+    """Une ligne du lot de retours et son résultat"""
+    number: int
+    text: str
+    loan_id: Optional[int] = None
+    isbn: str = ''
+    borrower_ref: str = ''
+    loan: Optional[Loan] = None
+    returned: bool = False
+    error: str = ''
+
+    @property
+    def ok(self):
+        return self.returned
+
+
+def parse_return_lines(text):
+    """Lignes du lot de retours : « numéro d'emprunt », « ISBN » ou « ISBN lecteur »"""
+    lines = []
+    for number, raw in enumerate(text.splitlines(), start=1):
+        raw = raw.strip()
+        if not raw:
+            continue
+        parts = LINE_SEPARATOR.split(raw, maxsplit=1)
+        line = ReturnLine(number=number, text=raw, borrower_ref=(parts[1:] or [''])[0].strip())
+        token = parts[0].lstrip('#')
+        if token.isdigit() and not ISBN_FORMAT.fullmatch(token) and not line.borrower_ref:
+            line.loan_id = int(token)
+        else:
+            try:
+                line.isbn = normalize_isbn(token)
+            except ImportRowError as exc:
+                line.error = str(exc)
+        lines.append(line)
+    return lines
+
+
+def _borrower_refs(loan):
+    profile = getattr(loan.borrower, 'profile', None)
+    return {loan.borrower.username, profile.matricule if profile else None}
+
+
+def _match_returns(lines):
+    """Emprunt de chaque ligne, à partir d'une seule lecture des emprunts"""
+    # of=self : le profil, joint en LEFT JOIN, ne peut pas être verrouillé
+    loans = Loan.objects.select_for_update(of=('self',)).filter(
+        Q(pk__in={line.loan_id for line in lines if line.loan_id})
+        | Q(status__in=OPEN_STATUSES, book__isbn__in={line.isbn for line in lines if line.isbn})
+    ).select_related('book', 'borrower__profile').order_by('due_date', 'id')
+    by_id = {}
+    open_by_isbn = defaultdict(list)
+    for loan in loans:
+        by_id[loan.pk] = loan
+        if loan.status in OPEN_STATUSES:
+            open_by_isbn[loan.book.isbn].append(loan)
+
+    taken = set()
+    # Numéros d'emprunt et couples ISBN + lecteur d'abord : sans ambiguïté
+    for line in lines:
+        if line.loan_id:
+            line.loan = by_id.get(line.loan_id)
+            if line.loan is None:
+                line.error = 'Emprunt inconnu'
+            elif line.loan.status not in OPEN_STATUSES:
+                line.error = 'Déjà retourné'
+        elif line.borrower_ref:
+            line.loan = next(
+                (loan for loan in open_by_isbn[line.isbn]
+                 if loan.pk not in taken and line.borrower_ref in _borrower_refs(loan)),
+                None,
+            )
+            if line.loan is None:
+                line.error = 'Aucun emprunt en cours de ce livre pour ce lecteur'
+        if line.loan is not None and not line.error:
+            if line.loan.pk in taken:
+                line.error = 'Scanné deux fois'
+            taken.add(line.loan.pk)
+
+    # ISBN seuls : il faut au moins autant de scans que d'emprunts restants
+    scans = defaultdict(list)
+    for line in lines:
+        if line.isbn and not line.borrower_ref and not line.error:
+            scans[line.isbn].append(line)
+    for isbn, isbn_lines in scans.items():
+        candidates = [loan for loan in open_by_isbn[isbn] if loan.pk not in taken]
+        if not candidates:
+            for line in isbn_lines:
+                line.error = 'Aucun emprunt en cours pour ce livre'
+        elif len(isbn_lines) < len(candidates):
+            for line in isbn_lines:
+                line.error = f'{len(candidates)} emprunts en cours pour ce livre : préciser le lecteur'
+        else:
+            for line, loan in zip_longest(isbn_lines, candidates):
+                if loan is None:
+                    line.error = 'Aucun autre emprunt en cours pour ce livre'
+                else:
+                    line.loan = loan
+                    taken.add(loan.pk)
+
+
+def _give_back_copies(loans, now):
+    """Rend les exemplaires : un UPDATE par nombre d'exemplaires rendus"""
+    by_count = defaultdict(list)
+    for book_id, count in Counter(loan.book_id for loan in loans).items():
+        by_count[count].append(book_id)
+    for count, book_ids in by_count.items():
+        Book.objects.filter(pk__in=book_ids).update(
+            available_quantity=F('available_quantity') + count,
+            status='AVAILABLE',
+            updated_at=now,
+        )
+
+
+def bulk_return(lines):
+    """Enregistre les retours des lignes valides du lot dans une transaction
+
+    Complète chaque ligne (``returned`` ou ``error``) et retourne les emprunts
+    rendus, avec leur date de retour. Lève CheckoutConflict, sans rien
+    enregistrer, si un emprunt a été rendu ailleurs pendant l'opération.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        pending = [line for line in lines if not line.error]
+        if pending:
+            _match_returns(pending)
+        pending = [line for line in pending if not line.error]
+        if not pending:
+            return []
+        loans = [line.loan for line in pending]
+        updated = Loan.objects.filter(pk__in=[loan.pk for loan in loans], status__in=OPEN_STATUSES).update(
+            return_date=now,
+            status='RETURNED',
+            updated_at=now,
+        )
+        if updated != len(loans):
+            raise CheckoutConflict
+        _give_back_copies(loans, now)
+        for line in pending:
+            line.loan.return_date = now
+            line.loan.status = 'RETURNED'
+            line.loan.updated_at = now
+            line.returned = True
+        rows_updated.send(sender=Loan)
+        rows_updated.send(sender=Book)
+    return loans
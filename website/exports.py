@@ -0,0 +1,129 @@
+"""Exports CSV et JSONL du catalogue et des emprunts.
+
+Les lignes sont lues par paquets (``iterator(chunk_size=...)``, curseur côté
+serveur sous PostgreSQL) sous forme de tuples, jointures comprises, puis
+sérialisées au fil de l'eau : la mémoire reste constante quel que soit le
+nombre de lignes. Utilisé par les vues export_books/export_loans et par la
+commande export_data.
+"""
+import csv
+import heapq
+import json
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+
+from .archive import loan_querysets
+from .models import Book
+from .search import filter_books
+
+EXPORT_CHUNK_SIZE = 2000
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# (en-tête, chemin ORM) de chaque colonne exportée
+BOOK_COLUMNS = [
+    ('id', 'id'),
+    ('isbn', 'isbn'),
+    ('title', 'title'),
+    ('author', 'author'),
+    ('publisher', 'publisher'),
+    ('publication_year', 'publication_year'),
+    ('category', 'category'),
+    ('quantity', 'quantity'),
+    ('available_quantity', 'available_quantity'),
+    ('status', 'status'),
+    ('created_at', 'created_at'),
+]
+
+LOAN_COLUMNS = [
+    ('id', 'id'),
+    ('book_id', 'book_id'),
+    ('book_isbn', 'book__isbn'),
+    ('book_title', 'book__title'),
+    ('borrower_id', 'borrower_id'),
+    ('borrower_username', 'borrower__username'),
+    ('borrower_first_name', 'borrower__first_name'),
+    ('borrower_last_name', 'borrower__last_name'),
+    ('borrower_email', 'borrower__email'),
+    ('borrower_user_type', 'borrower__profile__user_type'),
+    ('borrower_matricule', 'borrower__profile__matricule'),
+    ('librarian_username', 'librarian__username'),
+    ('borrow_date', 'borrow_date'),
+    ('due_date', 'due_date'),
+    ('return_date', 'return_date'),
+    ('status', 'status'),
+]
+
+
+def filter_loans(loans, status=None, since=None, until=None, **unused):
+    """Filtres des emprunts : statut et période d'emprunt (dates incluses)"""
+    if status:
+        loans = loans.filter(status=status)
+    if since:
+        loans = loans.filter(borrow_date__gte=_start_of(since))
+    if until:
+        loans = loans.filter(borrow_date__lt=_start_of(until + timedelta(days=1)))
+    return loans
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _value(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def book_rows(**filters):
+    """En-têtes et tuples des livres, par ordre d'id"""
+    books = filter_books(Book.objects.all(), **filters).order_by('id')
+    return _rows(books, BOOK_COLUMNS)
+
+
+def loan_rows(**filters):
+    """En-têtes et tuples des emprunts (livre, emprunteur et profil joints), par ordre d'id
+
+    Les emprunts archivés gardent leur id : les deux tables, lues chacune par
+    ordre d'id, sont fusionnées au fil de l'eau.
+    """
+    headers, rows = None, []
+    for loans in loan_querysets(filters.get('status')):
+        headers, table_rows = _rows(filter_loans(loans, **filters).order_by('id'), LOAN_COLUMNS)
+        rows.append(table_rows)
+    return headers, heapq.merge(*rows, key=lambda row: row[0])
+
+
+def _rows(queryset, columns):
+    headers = [header for header, _ in columns]
+    rows = queryset.values_list(*[path for _, path in columns]).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return headers, rows
+
+
+class _Echo:
+    """Pseudo-fichier : csv.writer renvoie directement la ligne écrite"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(headers, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([_value(value) for value in row])
+
+
+def stream_jsonl(headers, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(headers, map(_value, row))), ensure_ascii=False) + '\n'
+
+
+def stream(fmt, headers, rows):
+    """Lignes de texte au format demandé (csv ou jsonl)"""
+    return stream_csv(headers, rows) if fmt == 'csv' else stream_jsonl(headers, rows)
@@ -1,7 +1,10 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils.http import urlencode
 from .models import Book, Loan, UserProfile
+from .checkout import MAX_LINES, parse_lines, parse_return_lines
 from datetime import timedelta
 from django.utils import timezone
 
@@ -165,6 +168,39 @@ class BookForm(forms.ModelForm):
         return instance
 
 
+class AutocompleteSelect(forms.Select):
+    """Liste alimentée par un point d'accès JSON (website.autocomplete)
+
+    Seul le choix courant est rendu : la page ne grossit plus avec la table.
+    Le champ reste un ModelChoiceField, qui valide la valeur envoyée en une
+    requête.
+    """
+    template_name = 'website/widgets/autocomplete_select.html'
+    
+    def __init__(self, url_name, params=None, placeholder='Rechercher...', attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+        self.params = params or {}
+        self.placeholder = placeholder
+    
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        url = reverse(self.url_name)
+        context['widget']['url'] = f'{url}?{urlencode(self.params)}' if self.params else url
+        context['widget']['placeholder'] = self.placeholder
+        return context
+    
+    def optgroups(self, name, value, attrs=None):
+        selected = [str(v) for v in value if str(v) not in ('', 'None')]
+        options = [self.create_option(name, '', self.choices.field.empty_label or '', not selected, 0)]
+        if selected:
+            queryset = self.choices.queryset.filter(pk__in=selected)
+            for index, obj in enumerate(queryset, start=1):
+                option_value, label = self.choices.choice(obj)
+                options.append(self.create_option(name, option_value, label, True, index))
+        return [(None, options, 0)]
+
+
 class LoanForm(forms.ModelForm):
     """Formulaire pour créer un emprunt"""
     
@@ -172,8 +208,12 @@ class LoanForm(forms.ModelForm):
         model = Loan
         fields = ['book', 'borrower', 'due_date', 'notes']
         widgets = {
-            'book': forms.Select(attrs={'class': 'form-control'}),
-            'borrower': forms.Select(attrs={'class': 'form-control'}),
+            'book': AutocompleteSelect(
+                'autocomplete_books', {'available': 1}, 'Titre, auteur ou ISBN...', attrs={'class': 'form-control'},
+            ),
+            'borrower': AutocompleteSelect(
+                'autocomplete_borrowers', placeholder='Nom, identifiant ou matricule...', attrs={'class': 'form-control'},
+            ),
             'due_date': forms.DateTimeInput(attrs={
                 'class': 'form-control',
                 'type': 'datetime-local'
@@ -183,12 +223,12 @@ class LoanForm(forms.ModelForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Ne montrer que les livres disponibles
+        # Seuls les livres disponibles et les emprunteurs sont acceptés ; les
+        # listes ne sont plus rendues, mais proposées par l'autocomplétion
         self.fields['book'].queryset = Book.objects.filter(
             available_quantity__gt=0,
             status='AVAILABLE'
         )
-        # Ne montrer que les utilisateurs qui peuvent emprunter
         self.fields['borrower'].queryset = User.objects.filter(
             profile__user_type__in=['STUDENT', 'TEACHER', 'STAFF']
         )
@@ -197,6 +237,58 @@ class LoanForm(forms.ModelForm):
             self.fields['due_date'].initial = timezone.now() + timedelta(days=14)
 
 
+class BulkLoanForm(forms.Form):
+    """Emprunts en série : une ligne par exemplaire scanné"""
+    borrower = forms.CharField(
+        required=False,
+        label="Lecteur par défaut",
+        help_text="Nom d'utilisateur ou matricule, pour les lignes sans lecteur",
+        widget=forms.TextInput(attrs={'class': 'form-control'}),
+    )
+    lines = forms.CharField(
+        label="Exemplaires",
+        help_text="Une ligne par exemplaire : « ISBN » ou « ISBN lecteur »",
+        widget=forms.Textarea(attrs={'class': 'form-control font-monospace', 'rows': 12, 'autofocus': True}),
+    )
+    due_date = forms.DateTimeField(
+        label="Date de retour prévue",
+        widget=forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
+    )
+    notes = forms.CharField(
+        required=False,
+        label="Notes",
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
+    )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['due_date'].initial = timezone.now() + timedelta(days=14)
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        if 'lines' in cleaned_data:
+            lines = parse_lines(cleaned_data['lines'], cleaned_data.get('borrower', '').strip())
+            if len(lines) > MAX_LINES:
+                self.add_error('lines', f'{MAX_LINES} lignes au plus par lot.')
+            cleaned_data['lines'] = lines
+        return cleaned_data
+
+
+class BulkReturnForm(forms.Form):
+    """Retours en série : une ligne par exemplaire rendu"""
+    lines = forms.CharField(
+        label="Exemplaires rendus",
+        help_text="Une ligne par exemplaire : « numéro d'emprunt », « ISBN » ou « ISBN lecteur »",
+        widget=forms.Textarea(attrs={'class': 'form-control font-monospace', 'rows': 12, 'autofocus': True}),
+    )
+    
+    def clean_lines(self):
+        lines = parse_return_lines(self.cleaned_data['lines'])
+        if len(lines) > MAX_LINES:
+            raise forms.ValidationError(f'{MAX_LINES} lignes au plus par lot.')
+        return lines
+
+
 class BookSearchForm(forms.Form):
     """Formulaire de recherche de livres"""
     query = forms.CharField(
@@ -223,4 +315,12 @@ class BookSearchForm(forms.Form):
     )
 
 
-
+class LoanExportForm(forms.Form):
+    """Filtres de l'export des emprunts"""
+    status = forms.ChoiceField(
+        required=False,
+        label="Statut",
+        choices=[('', 'Tous')] + Loan.STATUS_CHOICES,
+    )
+    since = forms.DateField(required=False, label="Empruntés à partir du")
+    until = forms.DateField(required=False, label="Empruntés jusqu'au")
@@ -0,0 +1,48 @@
+"""Redimensionnement des couvertures avec Pillow.
+
+Ce module n'importe pas Django : ses fonctions s'exécutent dans les processus
+du pool de website.thumbnails, qui reçoivent et renvoient des octets.
+"""
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+THUMBNAIL_WIDTHS = (160, 320, 640)
+
+# Format -> (format Pillow, extension, options d'enregistrement)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def target_widths(width, widths=THUMBNAIL_WIDTHS):
+    """Largeurs à produire sans agrandir l'original (au moins une)"""
+    return [w for w in widths if w < width] or [width]
+
+
+def render_variants(data, widths=THUMBNAIL_WIDTHS):
+    """Retourne {format: {largeur: octets}} pour une image source
+
+    L'orientation EXIF est appliquée puis retirée ; les images avec
+    transparence sont aplaties sur fond blanc (le JPEG n'a pas de canal alpha).
+    """
+    with Image.open(BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+    variants = {fmt: {} for fmt in FORMATS}
+    for width in target_widths(image.width, widths):
+        height = max(round(image.height * width / image.width), 1)
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt, (pil_format, _, options) in FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, **options)
+            variants[fmt][width] = buffer.getvalue()
+    return variants
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from website.archive import ARCHIVE_BATCH_SIZE, archive_returned_loans
+
+
+class Command(BaseCommand):
+    help = (
+        "Déplace les emprunts rendus depuis plus de LOAN_ARCHIVE_AFTER_DAYS jours "
+        "dans la table d'archive, par lots, chacun dans sa transaction"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=None,
+            help="Âge minimal du retour, en jours (défaut : LOAN_ARCHIVE_AFTER_DAYS)",
+        )
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help="Emprunts déplacés par lot")
+        parser.add_argument('--pause', type=float, default=0, help="Pause entre deux lots (s)")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        archived = archive_returned_loans(
+            days=options['older_than'],
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            progress=self._progress if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{archived} emprunt(s) archivé(s) en {time.perf_counter() - start:.1f} s.'
+        ))
+
+    def _progress(self, archived):
+        self.stdout.write(f'{archived} emprunt(s) archivé(s)...')
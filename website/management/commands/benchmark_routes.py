@@ -0,0 +1,165 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from website.models import Book, Loan, UserProfile
+from website.urls import urlpatterns
+
+ROLES = ('anonyme', 'emprunteur', 'bibliothecaire')
+# Vues sans page GET à mesurer
+SKIPPED_ROUTES = {'logout'}
+# Paramètres GET obligatoires de certaines routes
+ROUTE_QUERIES = {
+    'api_availability': lambda kwargs: {'ids': kwargs['book_ids']},
+    'autocomplete_books': lambda kwargs: {'q': 'histoire', 'available': 1},
+    'autocomplete_borrowers': lambda kwargs: {'q': 'dia'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure chaque page de website/urls.py en anonyme, emprunteur et "
+        "bibliothécaire : latences p50/p95/p99, requêtes SQL et pic mémoire, "
+        "avec export JSON pour comparer deux exécutions (base courante, GET uniquement)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help="Requêtes mesurées par page et par rôle")
+        parser.add_argument('--routes', nargs='+', help="Noms des routes à mesurer (défaut : toutes)")
+        parser.add_argument('--roles', nargs='+', choices=ROLES, default=list(ROLES))
+        parser.add_argument('--cold', action='store_true', help="Vider le cache avant chaque requête")
+        parser.add_argument('-o', '--output', help="Fichier JSON des résultats")
+        parser.add_argument('--compare', help="Résultats JSON d'une exécution précédente")
+
+    def handle(self, *args, **options):
+        users = self.users()
+        kwargs = self.route_kwargs()
+        routes = [
+            pattern for pattern in urlpatterns
+            if pattern.name not in SKIPPED_ROUTES and (not options['routes'] or pattern.name in options['routes'])
+        ]
+        previous = self.load(options['compare']) if options['compare'] else {}
+
+        results = []
+        self.stdout.write(f"{'route':<24}{'rôle':<16}{'code':>5}{'p50':>8}{'p95':>8}{'p99':>8}{'SQL':>5}{'Kio':>8}")
+        for role in options['roles']:
+            if role != 'anonyme' and users[role] is None:
+                self.stderr.write(f'Aucun compte {role} : lancer seed_library')
+                continue
+            client = Client(raise_request_exception=False)
+            if users[role]:
+                client.force_login(users[role])
+            for pattern in routes:
+                params = {name: kwargs[name] for name in pattern.pattern.converters}
+                url = reverse(pattern.name, kwargs=params)
+                if pattern.name in ROUTE_QUERIES:
+                    url += '?' + urlencode(ROUTE_QUERIES[pattern.name](kwargs))
+                result = {'route': pattern.name, 'role': role, 'url': url, **self.measure(client, url, **options)}
+                results.append(result)
+                self.report(result, previous.get((pattern.name, role)))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump({'meta': self.meta(**options), 'results': results}, output, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {options['output']}"))
+
+    def users(self):
+        """Un emprunteur qui a des emprunts en cours et un bibliothécaire"""
+        borrower = Loan.objects.filter(status__in=['ACTIVE', 'OVERDUE']).select_related('borrower').first()
+        librarian = UserProfile.objects.filter(user_type='LIBRARIAN').select_related('user').first()
+        return {
+            'anonyme': None,
+            'emprunteur': borrower.borrower if borrower else None,
+            'bibliothecaire': librarian.user if librarian else None,
+        }
+
+    def route_kwargs(self):
+        book_ids = list(Book.objects.order_by('id').values_list('id', flat=True)[:20])
+        loan = Loan.objects.exclude(status='RETURNED').order_by('id').first()
+        if not book_ids or loan is None:
+            raise CommandError('Base vide : lancer seed_library avant le benchmark.')
+        return {'pk': book_ids[0], 'loan_id': loan.pk, 'book_ids': ','.join(map(str, book_ids))}
+
+    def request(self, client, url, cold):
+        if cold:
+            cache.clear()
+        response = client.get(url)
+        if response.streaming:
+            # Exports : la réponse n'est produite qu'à la lecture
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def measure(self, client, url, repeat, cold, **unused):
+        # Premier passage : caches, compilation des templates
+        self.request(client, url, cold)
+
+        # Requêtes SQL et mémoire sur un passage instrumenté, hors chronométrage
+        with CaptureQueriesContext(connection) as queries:
+            tracemalloc.start()
+            response = self.request(client, url, cold)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        # À lire tout de suite : chaque requête suivante vide le journal
+        query_count = len(queries)
+
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            self.request(client, url, cold)
+            latencies.append((time.perf_counter() - start) * 1000)
+        centiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+        return {
+            'status': response.status_code,
+            'p50_ms': round(centiles[49], 2),
+            'p95_ms': round(centiles[94], 2),
+            'p99_ms': round(centiles[98], 2),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'queries': query_count,
+            'peak_memory_kib': round(peak / 1024, 1),
+            'repeat': repeat,
+        }
+
+    def report(self, result, previous):
+        line = (
+            f"{result['route']:<24}{result['role']:<16}{result['status']:>5}{result['p50_ms']:>8.1f}"
+            f"{result['p95_ms']:>8.1f}{result['p99_ms']:>8.1f}{result['queries']:>5}{result['peak_memory_kib']:>8.0f}"
+        )
+        if previous:
+            ratio = result['p50_ms'] / previous['p50_ms'] if previous['p50_ms'] else 1
+            line += f"  p50 x{ratio:.2f}, SQL {result['queries'] - previous['queries']:+d}"
+        self.stdout.write(line)
+
+    def load(self, path):
+        try:
+            with open(path, encoding='utf-8') as stream:
+                return {(result['route'], result['role']): result for result in json.load(stream)['results']}
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f'Comparaison impossible avec {path} : {exc}')
+
+    def meta(self, repeat, cold, **unused):
+        return {
+            'date': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'cache': settings.CACHES['default']['BACKEND'],
+            'debug': settings.DEBUG,
+            'books': Book.objects.count(),
+            'loans': Loan.objects.count(),
+            'repeat': repeat,
+            'cold': cold,
+        }
@@ -0,0 +1,72 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from website.models import Book
+from website.search import IcontainsSearchBackend, get_search_backend
+
+WORDS = [
+    'histoire', 'prince', 'misérables', 'étranger', 'été', 'forêt', 'mémoire', 'république',
+    'économie', 'réseau', 'données', 'algèbre', 'physique', 'chimie', 'littérature', 'poésie',
+    'théâtre', 'roman', 'voyage', 'océan', 'société', 'électricité', 'géographie', 'philosophie',
+    'médecine', 'droit', 'fleuve', 'montagne', 'lumière', 'nuit', 'guerre', 'paix', 'éducation',
+]
+AUTHORS = ['Hugo', 'Zola', 'Camus', 'Sartre', 'Beauvoir', 'Senghor', 'Césaire', 'Béti', 'Oyono', 'Dumas']
+QUERIES = ['prince', 'miserables', 'econ', 'foret nuit', 'Césaire', 'zzzz']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare la recherche plein texte au filtre icontains sur un catalogue "
+        "synthétique (créé dans une transaction annulée à la fin)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+        parser.add_argument('--repeat', type=int, default=5, help="Mesures par requête")
+        parser.add_argument('--page-size', type=int, default=24)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        self.stdout.write(f'Backend : {type(backend).__name__}')
+        for size in options['sizes']:
+            random.seed(options['seed'])
+            with transaction.atomic():
+                self.populate(backend, size)
+                self.compare(backend, size, options['repeat'], options['page_size'])
+                transaction.set_rollback(True)
+
+    def populate(self, backend, size, batch_size=10_000):
+        start = time.perf_counter()
+        for offset in range(0, size, batch_size):
+            books = Book.objects.bulk_create(
+                Book(
+                    title=' '.join(random.choices(WORDS, k=3)).capitalize(),
+                    author=random.choice(AUTHORS),
+                    category=random.choice(WORDS),
+                    isbn=f'bench{offset + i:08d}',
+                )
+                for i in range(min(batch_size, size - offset))
+            )
+            backend.index_books(books)
+        self.stdout.write(f'\n{size} livres créés et indexés en {time.perf_counter() - start:.1f} s')
+
+    def compare(self, backend, size, repeat, page_size):
+        self.stdout.write(f"{'requête':<14}{'icontains (ms)':>16}{'plein texte (ms)':>18}{'gain':>8}")
+        for query in QUERIES:
+            baseline = self.measure(IcontainsSearchBackend(), query, repeat, page_size, ordering=('-created_at', '-id'))
+            indexed = self.measure(backend, query, repeat, page_size, ordering=('search_rank', 'id'))
+            self.stdout.write(f'{query:<14}{baseline:>16.1f}{indexed:>18.1f}{baseline / max(indexed, 0.001):>7.1f}x')
+
+    def measure(self, backend, query, repeat, page_size, ordering):
+        """Médiane du temps de la première page de résultats, en millisecondes"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(backend.search(Book.objects.all(), query).order_by(*ordering)[:page_size])
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,132 @@
+import random
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from web_library.database import sqlite_database
+from website.models import Book, Loan
+
+PROFILES = {
+    'défaut': {'SQLITE_TUNED': '0'},
+    'réglé': {'SQLITE_TUNED': '1'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le débit des lectures et des emprunts concurrents sous SQLite, "
+        "avec les réglages par défaut puis avec le profil SQLITE_TUNED "
+        "(bases temporaires)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help="Threads de lecture (catalogue)")
+        parser.add_argument('--writers', type=int, default=4, help="Threads d'écriture (emprunt puis retour)")
+        parser.add_argument('--duration', type=float, default=10, help="Durée de chaque mesure (s)")
+        parser.add_argument('--books', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['readers']} lecteurs, {options['writers']} écrivains, "
+            f"{options['duration']:.0f} s par profil"
+        )
+        self.stdout.write(f"{'profil':<10}{'lectures/s':>12}{'écritures/s':>13}{'verrouillées':>14}{'p99 écriture (ms)':>19}")
+        with tempfile.TemporaryDirectory() as directory:
+            for i, (profile, environ) in enumerate(PROFILES.items()):
+                random.seed(options['seed'])
+                alias = f'benchmark_sqlite_{i}'
+                connections.settings[alias] = connections.configure_settings({
+                    'default': connections.settings['default'],
+                    alias: sqlite_database(Path(directory) / f'{alias}.sqlite3', environ),
+                })[alias]
+                try:
+                    self.populate(alias, options['books'], options['writers'])
+                    self.report(profile, self.measure(alias, **options))
+                finally:
+                    connections[alias].close()
+                    del connections.settings[alias]
+
+    def populate(self, alias, size, writers):
+        call_command('migrate', database=alias, verbosity=0)
+        Book.objects.using(alias).bulk_create(
+            Book(title=f'Livre {i}', author=f'Auteur {i % 100}', isbn=f'bench{i:08d}',
+                 category=f'Catégorie {i % 20}', quantity=3, available_quantity=3)
+            for i in range(size)
+        )
+        User.objects.using(alias).bulk_create(User(username=f'lecteur{i}') for i in range(writers))
+
+    def measure(self, alias, readers, writers, duration, **unused):
+        book_ids = list(Book.objects.using(alias).values_list('id', flat=True))
+        user_ids = list(User.objects.using(alias).values_list('id', flat=True))
+        stats = {'reads': 0, 'writes': 0, 'locked': 0, 'latencies': []}
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+
+        def read():
+            # Page du catalogue et compteurs, comme l'accueil et book_list
+            books = Book.objects.using(alias)
+            list(books.filter(category=f'Catégorie {random.randrange(20)}').order_by('-created_at', '-id')[:24])
+            books.filter(status='AVAILABLE').count()
+
+        def write(user_id):
+            # Emprunt puis retour, chacun dans sa transaction (comme Loan.checkout/return_book)
+            book_id = random.choice(book_ids)
+            with transaction.atomic(using=alias):
+                if Book.objects.using(alias).filter(pk=book_id, available_quantity__gt=0).update(
+                    available_quantity=F('available_quantity') - 1
+                ):
+                    Loan.objects.using(alias).bulk_create([Loan(
+                        book_id=book_id, borrower_id=user_id, due_date=timezone.now() + timedelta(days=14),
+                    )])
+            with transaction.atomic(using=alias):
+                Loan.objects.using(alias).filter(book_id=book_id, borrower_id=user_id, status='ACTIVE').update(
+                    status='RETURNED', return_date=timezone.now(),
+                )
+                Book.objects.using(alias).filter(pk=book_id).update(available_quantity=F('available_quantity') + 1)
+
+        def worker(kind, user_id=None):
+            try:
+                while time.monotonic() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        read() if kind == 'reads' else write(user_id)
+                    except OperationalError:
+                        # « database is locked » : l'opération est perdue
+                        with lock:
+                            stats['locked'] += 1
+                        continue
+                    with lock:
+                        stats[kind] += 1
+                        if kind == 'writes':
+                            stats['latencies'].append((time.perf_counter() - start) * 1000)
+            finally:
+                connections[alias].close()
+
+        threads = [threading.Thread(target=worker, args=('reads',)) for _ in range(readers)]
+        threads += [threading.Thread(target=worker, args=('writes', user_ids[i])) for i in range(writers)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats['elapsed'] = time.monotonic() - start
+        return stats
+
+    def report(self, profile, stats):
+        elapsed = stats['elapsed']
+        latencies = sorted(stats['latencies'])
+        p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+        self.stdout.write(
+            f"{profile:<10}{stats['reads'] / elapsed:>12.0f}{stats['writes'] / elapsed:>13.0f}"
+            f"{stats['locked']:>14}{p99:>19.1f}"
+        )
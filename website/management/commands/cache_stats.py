@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from website.cache import CATALOGUE, cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Affiche les compteurs du cache du catalogue (hit, stale, wait, miss)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--namespace', default=CATALOGUE, help="Espace de noms du cache")
+        parser.add_argument('--reset', action='store_true', help="Remet les compteurs à zéro après affichage")
+
+    def handle(self, *args, **options):
+        stats = cache_stats(options['namespace'])
+        total = sum(stats.values())
+        for event, count in stats.items():
+            self.stdout.write(f'{event:>6} : {count}')
+        if total:
+            served = stats['hit'] + stats['stale'] + stats['wait']
+            self.stdout.write(f'Taux de réponses servies par le cache : {served / total:.1%}')
+        if options['reset']:
+            reset_cache_stats(options['namespace'])
@@ -0,0 +1,37 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime les sessions expirées de la table django_session par lots, "
+        "chacun dans sa transaction (au lieu du DELETE unique de clearsessions)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Sessions supprimées par lot")
+        parser.add_argument('--pause', type=float, default=0, help="Pause entre deux lots (s)")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        # Borne fixée au départ : les sessions qui expirent pendant la purge
+        # attendent le prochain passage
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now).order_by('expire_date')
+        deleted = 0
+        while True:
+            keys = list(expired.values_list('session_key', flat=True)[:options['batch_size']])
+            if not keys:
+                break
+            # Session n'a ni relation ni signal : un seul DELETE ... IN par lot
+            deleted += Session.objects.filter(session_key__in=keys, expire_date__lt=now).delete()[0]
+            if len(keys) < options['batch_size']:
+                break
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted} session(s) expirée(s) supprimée(s) en {time.perf_counter() - start:.1f} s.'
+        ))
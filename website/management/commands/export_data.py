@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from website.exports import FORMATS, book_rows, loan_rows, stream
+from website.forms import BookSearchForm, LoanExportForm
+
+EXPORTS = {
+    'books': (BookSearchForm, book_rows),
+    'loans': (LoanExportForm, loan_rows),
+}
+
+
+class Command(BaseCommand):
+    help = "Exporte le catalogue ou les emprunts en CSV ou JSONL, ligne par ligne"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS), help="Données à exporter")
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help="Fichier de sortie (défaut : sortie standard)")
+        parser.add_argument('--status', help="Statut du livre ou de l'emprunt")
+        parser.add_argument('--category', help="Catégorie (livres)")
+        parser.add_argument('--query', help="Recherche plein texte (livres)")
+        parser.add_argument('--since', help="Empruntés à partir du (AAAA-MM-JJ, emprunts)")
+        parser.add_argument('--until', help="Empruntés jusqu'au (AAAA-MM-JJ, emprunts)")
+
+    def handle(self, *args, **options):
+        form_class, export_rows = EXPORTS[options['kind']]
+        # Mêmes règles de validation que les vues d'export
+        filters = {name: options[name] for name in ('status', 'category', 'query', 'since', 'until') if options[name]}
+        form = form_class(filters)
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+        headers, rows = export_rows(**form.cleaned_data)
+
+        lines = stream(options['format'], headers, rows)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
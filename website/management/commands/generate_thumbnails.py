@@ -0,0 +1,62 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from website.imaging import render_variants
+from website.models import Book
+from website.thumbnails import needs_thumbnails, read_cover, store_variants
+
+
+class Command(BaseCommand):
+    help = "Génère les miniatures manquantes des couvertures existantes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Processus de redimensionnement (défaut : THUMBNAIL_WORKERS, 0 = séquentiel)",
+        )
+        parser.add_argument('--force', action='store_true', help="Régénère aussi les miniatures à jour")
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers is None:
+            workers = settings.THUMBNAIL_WORKERS
+        books = (
+            Book.objects.exclude(cover_image='').exclude(cover_image__isnull=True)
+            .only('id', 'cover_image', 'cover_variants').order_by('id')
+        )
+        jobs = [
+            (book.pk, book.cover_image.name)
+            for book in books.iterator()
+            if options['force'] or needs_thumbnails(book)
+        ]
+
+        self.done = self.failed = 0
+        if workers:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # Peu de fichiers en mémoire à la fois : quelques tâches d'avance par processus
+                pending = {}
+                for book_id, source_name in jobs:
+                    future = executor.submit(render_variants, read_cover(source_name))
+                    pending[future] = (book_id, source_name)
+                    if len(pending) >= workers * 4:
+                        self.collect(pending, wait(pending, return_when=FIRST_COMPLETED).done)
+                self.collect(pending, wait(pending).done)
+        else:
+            for book_id, source_name in jobs:
+                self.store(book_id, source_name, lambda: render_variants(read_cover(source_name)))
+
+        self.stdout.write(self.style.SUCCESS(f'{self.done} couverture(s) traitée(s), {self.failed} échec(s).'))
+
+    def collect(self, pending, finished):
+        for future in finished:
+            book_id, source_name = pending.pop(future)
+            self.store(book_id, source_name, future.result)
+
+    def store(self, book_id, source_name, render):
+        try:
+            self.done += store_variants(book_id, source_name, render())
+        except Exception as exc:
+            self.failed += 1
+            self.stderr.write(f'{source_name} : {exc}')
@@ -0,0 +1,53 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from website.importer import import_file
+
+
+class Command(BaseCommand):
+    help = "Importe ou met à jour des livres depuis un fichier CSV (avec en-tête) ou JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier .csv ou .jsonl (colonnes : isbn, title, author, quantity, ...)")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Format du fichier (défaut : d'après l'extension)")
+        parser.add_argument('--batch-size', type=int, default=2000, help="Livres écrits par transaction")
+        parser.add_argument('--resume', action='store_true', help="Reprendre après le dernier lot validé d'un import interrompu")
+        parser.add_argument('--added-by', help="Nom d'utilisateur enregistré comme auteur des nouveaux livres")
+
+    def handle(self, *args, **options):
+        added_by = None
+        if options['added_by']:
+            added_by = User.objects.filter(username=options['added_by']).first()
+            if added_by is None:
+                raise CommandError(f"Utilisateur inconnu : {options['added_by']}")
+
+        self.started = time.perf_counter()
+        try:
+            importer = import_file(
+                options['path'],
+                fmt=options['format'],
+                batch_size=options['batch_size'],
+                resume=options['resume'],
+                added_by=added_by,
+                progress=self.progress,
+            )
+        except OSError as exc:
+            raise CommandError(exc)
+
+        for line, error in importer.errors[:20]:
+            self.stderr.write(f'Ligne {line} ignorée : {error}')
+        if len(importer.errors) > 20:
+            self.stderr.write(f'... et {len(importer.errors) - 20} autre(s) ligne(s) ignorée(s)')
+        self.stdout.write(self.style.SUCCESS(
+            f'{importer.created} livre(s) créé(s), {importer.updated} mis à jour, '
+            f'{len(importer.errors)} ligne(s) ignorée(s) en {time.perf_counter() - self.started:.1f} s '
+            f'({self.rate(importer):.0f} lignes/s).'
+        ))
+
+    def rate(self, importer):
+        return (importer.line - importer.start) / max(time.perf_counter() - self.started, 1e-6)
+
+    def progress(self, importer):
+        self.stdout.write(f'Ligne {importer.line} : {self.rate(importer):.0f} lignes/s')
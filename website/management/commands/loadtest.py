@@ -0,0 +1,117 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Charge un serveur déjà démarré (WSGI ou ASGI) avec N connexions "
+        "keep-alive simultanées et affiche débit et latences"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help="URL(s) interrogées à tour de rôle")
+        parser.add_argument('--concurrency', type=int, default=500, help="Connexions simultanées")
+        parser.add_argument('--duration', type=float, default=20, help="Durée de la mesure (s)")
+        parser.add_argument(
+            '--slow-client', type=float, default=0, metavar='MS',
+            help="Pause au milieu de l'envoi de chaque requête (client mobile lent)",
+        )
+        parser.add_argument('--timeout', type=float, default=30, help="Délai maximal d'une réponse (s)")
+
+    def handle(self, *args, **options):
+        targets = [urlsplit(url) for url in options['urls']]
+        if any(target.scheme != 'http' or not target.hostname for target in targets):
+            raise CommandError('Seules les URL http://hôte[:port]/chemin sont prises en charge.')
+        latencies, errors, elapsed = asyncio.run(self.run(targets, **options))
+
+        done = len(latencies)
+        self.stdout.write(
+            f"{options['concurrency']} connexions, {elapsed:.1f} s : {done} réponses "
+            f"({done / elapsed:.0f} req/s), {sum(errors.values())} erreurs"
+        )
+        if latencies:
+            centiles = statistics.quantiles(latencies, n=100) if done > 1 else latencies * 99
+            self.stdout.write(
+                f'latence (ms) : p50 {centiles[49]:.0f}  p95 {centiles[94]:.0f}  '
+                f'p99 {centiles[98]:.0f}  max {max(latencies):.0f}'
+            )
+        for error, count in sorted(errors.items()):
+            self.stdout.write(f'  {count} x {error}')
+
+    async def run(self, targets, concurrency, duration, slow_client, timeout, **unused):
+        latencies = []
+        errors = {}
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(
+            self.client(targets[i % len(targets):] + targets[:i % len(targets)],
+                        deadline, slow_client / 1000, timeout, latencies, errors)
+            for i in range(concurrency)
+        ))
+        return latencies, errors, time.perf_counter() - start
+
+    async def client(self, targets, deadline, pause, timeout, latencies, errors):
+        """Une connexion : requêtes enchaînées jusqu'à la fin de la mesure"""
+        connection = None
+        i = 0
+        while time.perf_counter() < deadline:
+            target = targets[i % len(targets)]
+            i += 1
+            began = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = await asyncio.wait_for(
+                        asyncio.open_connection(target.hostname, target.port or 80), timeout
+                    )
+                keep_alive = await asyncio.wait_for(self.request(connection, target, pause), timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as exc:
+                error = type(exc).__name__
+                errors[error] = errors.get(error, 0) + 1
+                keep_alive = False
+                if connection is None:
+                    # Serveur injoignable : ne pas boucler à vide
+                    await asyncio.sleep(0.1)
+            else:
+                latencies.append((time.perf_counter() - began) * 1000)
+            if not keep_alive and connection is not None:
+                connection[1].close()
+                connection = None
+        if connection is not None:
+            connection[1].close()
+
+    async def request(self, connection, target, pause):
+        """Envoie une requête GET et lit la réponse ; True si la connexion reste ouverte"""
+        reader, writer = connection
+        path = target.path or '/'
+        if target.query:
+            path += f'?{target.query}'
+        head = f'GET {path} HTTP/1.1\r\nHost: {target.netloc}\r\n'.encode()
+        writer.write(head)
+        if pause:
+            await writer.drain()
+            await asyncio.sleep(pause)
+        writer.write(b'User-Agent: loadtest\r\nAccept: text/html\r\n\r\n')
+        await writer.drain()
+
+        status = await reader.readuntil(b'\r\n')
+        code = int(status.split()[1])
+        headers = {}
+        while (line := await reader.readuntil(b'\r\n')) != b'\r\n':
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while size := int((await reader.readuntil(b'\r\n')).split(b';')[0], 16):
+                await reader.readexactly(size + 2)
+            await reader.readuntil(b'\r\n')
+        elif 'content-length' in headers:
+            await reader.readexactly(int(headers['content-length']))
+        else:
+            await reader.read()
+            return False
+        if code >= 400:
+            raise ValueError(f'HTTP {code}')
+        return headers.get('connection', '').lower() != 'close'
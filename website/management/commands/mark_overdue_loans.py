@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from website.models import Loan
+
+
+class Command(BaseCommand):
+    help = "Passe en retard (OVERDUE) les emprunts en cours dont l'échéance est dépassée"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help="Ignorer le point de reprise et parcourir toutes les échéances dépassées",
+        )
+
+    def handle(self, *args, **options):
+        count = Loan.mark_overdue(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'{count} emprunt(s) passé(s) en retard.'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from website.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte du catalogue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help="Livres indexés par lot")
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Index reconstruit ({type(backend).__name__}).'))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from website.stats import reconcile_loan_counters
+
+
+class Command(BaseCommand):
+    help = "Recalcule le nombre d'emprunts de chaque livre (Book.total_loans) d'après la table des emprunts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Livres vérifiés par transaction")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        fixed = reconcile_loan_counters(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{fixed} compteur(s) corrigé(s) en {time.perf_counter() - start:.1f} s.'
+        ))
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from website.seed import SEED_PASSWORD, seed_library
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un jeu de données réaliste : livres, lecteurs de chaque type, "
+        "emprunts en cours, en retard et rendus"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=1000)
+        parser.add_argument('--students', type=int, default=200)
+        parser.add_argument('--teachers', type=int, default=20)
+        parser.add_argument('--staff', type=int, default=10)
+        parser.add_argument('--librarians', type=int, default=3)
+        parser.add_argument('--active', type=int, default=200, help="Emprunts en cours")
+        parser.add_argument('--overdue', type=int, default=50, help="Emprunts en retard")
+        parser.add_argument('--returned', type=int, default=1000, help="Emprunts rendus (historique)")
+        parser.add_argument('--seed', type=int, help="Graine du tirage (reproductible)")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            created = seed_library(
+                books=options['books'],
+                users={
+                    'STUDENT': options['students'],
+                    'TEACHER': options['teachers'],
+                    'STAFF': options['staff'],
+                    'LIBRARIAN': options['librarians'],
+                },
+                active=options['active'],
+                overdue=options['overdue'],
+                returned=options['returned'],
+                seed=options['seed'],
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+        self.stdout.write(self.style.SUCCESS(
+            f"{created['books']} livre(s), {created['users']} utilisateur(s), "
+            f"{created['active']} emprunt(s) en cours, {created['overdue']} en retard et "
+            f"{created['returned']} rendu(s) créés en {time.perf_counter() - started:.1f} s "
+            f"(mot de passe des comptes : {SEED_PASSWORD})."
+        ))
@@ -0,0 +1,146 @@
+"""Profilage des requêtes en production.
+
+Sur une fraction des requêtes (REQUEST_PROFILER_SAMPLE_RATE), mesure le nombre
+et la durée des requêtes SQL, le temps de rendu des templates et le temps de
+la vue. Le résultat est exposé dans l'en-tête Server-Timing (lisible dans les
+outils de développement du navigateur) et journalisé en JSON sur le logger
+``website.profiler``.
+"""
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger('website.profiler')
+
+_current_profile = ContextVar('current_profile', default=None)
+_original_template_render = Template.render
+
+
+def _profiled_template_render(self, context):
+    """Template.render instrumenté : chronomètre le rendu de premier niveau"""
+    profile = _current_profile.get()
+    if profile is None:
+        return _original_template_render(self, context)
+    profile.template_depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_template_render(self, context)
+    finally:
+        profile.template_depth -= 1
+        if profile.template_depth == 0:
+            profile.template_time += time.perf_counter() - start
+
+
+class RequestProfile:
+    """Mesures collectées pendant une requête"""
+
+    def __init__(self):
+        self.queries = []
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.total_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper : chronomètre chaque requête SQL
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @property
+    def db_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    @property
+    def duplicate_queries(self):
+        """Requêtes répétées avec le même SQL (paramètres exclus) : signe de N+1"""
+        counts = Counter(sql for sql, _ in self.queries)
+        return sum(count - 1 for count in counts.values() if count > 1)
+
+    @property
+    def view_time(self):
+        """Temps passé hors base de données et hors templates"""
+        return max(self.total_time - self.db_time - self.template_time, 0.0)
+
+    def slowest_queries(self, limit=3):
+        return sorted(self.queries, key=lambda query: query[1], reverse=True)[:limit]
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{len(self.queries)} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'view;dur={self.view_time * 1000:.1f}',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ])
+
+
+class RequestProfilerMiddleware:
+    """Profilage par requête : nombre et durée des requêtes SQL, rendu, vue
+
+    Activé si REQUEST_PROFILER_SAMPLE_RATE > 0 (fraction des requêtes
+    profilées). Ajoute un en-tête Server-Timing et une ligne de log JSON ;
+    les requêtes qui dépassent REQUEST_PROFILER_MAX_QUERIES ou
+    REQUEST_PROFILER_SLOW_MS sont journalisées en WARNING avec leur SQL le
+    plus lent.
+    """
+
+    def __init__(self, get_response):
+        self.sample_rate = getattr(settings, 'REQUEST_PROFILER_SAMPLE_RATE', 0)
+        if not self.sample_rate:
+            raise MiddlewareNotUsed
+        self.max_queries = getattr(settings, 'REQUEST_PROFILER_MAX_QUERIES', 50)
+        self.slow_ms = getattr(settings, 'REQUEST_PROFILER_SLOW_MS', 500)
+        self.get_response = get_response
+        Template.render = _profiled_template_render
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+            profile.total_time = time.perf_counter() - start
+
+        response['Server-Timing'] = profile.server_timing()
+        self.log(request, response, profile)
+        return response
+
+    def log(self, request, response, profile):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': len(profile.queries),
+            'duplicate_queries': profile.duplicate_queries,
+            'db_ms': round(profile.db_time * 1000, 1),
+            'template_ms': round(profile.template_time * 1000, 1),
+            'view_ms': round(profile.view_time * 1000, 1),
+            'total_ms': round(profile.total_time * 1000, 1),
+        }
+        if len(profile.queries) > self.max_queries or profile.total_time * 1000 > self.slow_ms:
+            record['slowest_sql'] = [
+                {'sql': sql, 'ms': round(duration * 1000, 1)}
+                for sql, duration in profile.slowest_queries()
+            ]
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0002_overdue_sweep'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['status', 'created_at'], name='book_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['category'], name='book_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['borrower', 'status'], name='loan_borrower_status_idx'),
+        ),
+        # Supprimer l'index simple sur borrower une fois l'index composite créé
+        migrations.AlterField(
+            model_name='loan',
+            name='borrower',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='loans', to=settings.AUTH_USER_MODEL, verbose_name='Emprunteur'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('status__in', ['ACTIVE', 'OVERDUE'])), fields=['book', 'borrower'], name='loan_open_book_borrower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['user_type'], name='profile_user_type_idx'),
+        ),
+    ]
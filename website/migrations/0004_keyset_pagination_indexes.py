@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0003_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['created_at', 'id'], name='book_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['borrower', 'status', 'borrow_date'], name='loan_borrower_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['borrow_date', 'id'], name='loan_borrow_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['status', 'borrow_date'], name='loan_status_borrow_date_idx'),
+        ),
+        # Supprimer l'ancien index une fois son remplaçant créé
+        migrations.RemoveIndex(
+            model_name='loan',
+            name='loan_borrower_status_idx',
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:31
+
+import django.db.models.deletion
+import website.models
+from django.db import migrations, models
+
+
+def install_search_index(apps, schema_editor):
+    from website.search import get_search_backend
+
+    backend = get_search_backend(schema_editor.connection)
+    backend.install(schema_editor)
+    backend.rebuild(apps.get_model('website', 'Book').objects.using(schema_editor.connection.alias))
+
+
+def uninstall_search_index(apps, schema_editor):
+    from website.search import get_search_backend
+
+    get_search_backend(schema_editor.connection).uninstall(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0004_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookSearchEntry',
+            fields=[
+                ('book', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='website.book')),
+                ('document', website.models.SearchDocumentField()),
+            ],
+            options={
+                'db_table': 'website_book_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0006_book_cover_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobcheckpoint',
+            name='offset',
+            field=models.BigIntegerField(default=0, verbose_name='Lignes traitées'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:06
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_loans(apps, schema_editor):
+    Book = apps.get_model('website', 'Book')
+    Loan = apps.get_model('website', 'Loan')
+    loans = Loan.objects.filter(book=OuterRef('pk')).order_by().values('book').annotate(count=Count('id')).values('count')
+    Book.objects.using(schema_editor.connection.alias).update(total_loans=Coalesce(Subquery(loans), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0007_jobcheckpoint_offset'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='total_loans',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Nombre d'emprunts"),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-total_loans', 'id'], name='book_total_loans_idx'),
+        ),
+        migrations.RunPython(count_existing_loans, migrations.RunPython.noop),
+    ]
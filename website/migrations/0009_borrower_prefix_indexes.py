@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:22
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+# auth_user appartient à django.contrib.auth : ses index d'autocomplétion
+# sont créés ici en SQL (même syntaxe sous SQLite et PostgreSQL)
+USER_PREFIX_INDEXES = {
+    'website_user_username_lower_idx': 'username',
+    'website_user_first_name_lower_idx': 'first_name',
+    'website_user_last_name_lower_idx': 'last_name',
+}
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0008_book_total_loans'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(django.db.models.functions.text.Lower('matricule'), name='profile_matricule_lower_idx'),
+        ),
+        *[
+            migrations.RunSQL(
+                f'CREATE INDEX {name} ON auth_user (LOWER({column}))',
+                f'DROP INDEX {name}',
+            )
+            for name, column in USER_PREFIX_INDEXES.items()
+        ],
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0009_borrower_prefix_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedLoan',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('borrow_date', models.DateTimeField(verbose_name="Date d'emprunt")),
+                ('due_date', models.DateTimeField(verbose_name='Date de retour prévue')),
+                ('return_date', models.DateTimeField(blank=True, null=True, verbose_name='Date de retour effective')),
+                ('status', models.CharField(choices=[('ACTIVE', 'En cours'), ('RETURNED', 'Retourné'), ('OVERDUE', 'En retard')], default='RETURNED', max_length=20, verbose_name='Statut')),
+                ('notes', models.TextField(blank=True, null=True, verbose_name='Notes')),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_loans', to='website.book', verbose_name='Livre')),
+                ('borrower', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_loans', to=settings.AUTH_USER_MODEL, verbose_name='Emprunteur')),
+                ('librarian', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Bibliothécaire')),
+            ],
+            options={
+                'verbose_name': 'Emprunt archivé',
+                'verbose_name_plural': 'Emprunts archivés',
+                'ordering': ['-borrow_date'],
+                'indexes': [models.Index(fields=['borrower', 'borrow_date', 'id'], name='archived_loan_borrower_idx'), models.Index(fields=['borrow_date', 'id'], name='archived_loan_borrow_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:50
+
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Index LOWER(...) de la migration 0009, remplacés par les clés normalisées
+USER_PREFIX_INDEXES = {
+    'website_user_username_lower_idx': 'username',
+    'website_user_first_name_lower_idx': 'first_name',
+    'website_user_last_name_lower_idx': 'last_name',
+}
+BATCH_SIZE = 2000
+KEYS = ['username_key', 'first_name_key', 'last_name_key', 'matricule_key']
+
+
+def normalize(text):
+    # Copie de website.search.normalize au moment de la migration
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def fill_search_keys(apps, schema_editor):
+    UserProfile = apps.get_model('website', 'UserProfile')
+    profiles = UserProfile.objects.using(schema_editor.connection.alias).select_related('user').order_by('pk')
+    batch = []
+    for profile in profiles.iterator(chunk_size=BATCH_SIZE):
+        profile.username_key = normalize(profile.user.username)
+        profile.first_name_key = normalize(profile.user.first_name)
+        profile.last_name_key = normalize(profile.user.last_name)
+        profile.matricule_key = normalize(profile.matricule)
+        batch.append(profile)
+        if len(batch) == BATCH_SIZE:
+            UserProfile.objects.using(schema_editor.connection.alias).bulk_update(batch, KEYS)
+            batch = []
+    if batch:
+        UserProfile.objects.using(schema_editor.connection.alias).bulk_update(batch, KEYS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0010_archived_loan'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='userprofile',
+            name='profile_matricule_lower_idx',
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='first_name_key',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='last_name_key',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='matricule_key',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='username_key',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=150),
+        ),
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+        *[
+            migrations.RunSQL(
+                f'DROP INDEX {name}',
+                f'CREATE INDEX {name} ON auth_user (LOWER({column}))',
+            )
+            for name, column in USER_PREFIX_INDEXES.items()
+        ],
+    ]
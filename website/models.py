@@ -1,8 +1,11 @@
-from django.db import models
+from django.db import NotSupportedError, models, transaction
+from django.db.models import Case, F, Value, When
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
 
+from .signals import rows_updated
+
 # Create your models here.
 
 class UserProfile(models.Model):
@@ -21,10 +24,28 @@ class UserProfile(models.Model):
     address = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Autocomplétion des emprunteurs (website.autocomplete) : identifiant,
+    # prénom, nom et matricule en minuscules sans accents, recalculés à chaque
+    # enregistrement du profil ou de l'utilisateur
+    username_key = models.CharField(max_length=150, blank=True, default='', editable=False, db_index=True)
+    first_name_key = models.CharField(max_length=150, blank=True, default='', editable=False, db_index=True)
+    last_name_key = models.CharField(max_length=150, blank=True, default='', editable=False, db_index=True)
+    matricule_key = models.CharField(max_length=50, blank=True, default='', editable=False, db_index=True)
+    
+    # Clé de recherche -> champ d'origine (sur le profil pour le matricule)
+    SEARCH_KEYS = {
+        'username_key': 'username',
+        'first_name_key': 'first_name',
+        'last_name_key': 'last_name',
+        'matricule_key': 'matricule',
+    }
     
     class Meta:
         verbose_name = "Profil Utilisateur"
         verbose_name_plural = "Profils Utilisateurs"
+        indexes = [
+            models.Index(fields=['user_type'], name='profile_user_type_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name() or self.user.username} - {self.get_user_type_display()}"
@@ -33,8 +54,19 @@ class UserProfile(models.Model):
         """Convertir les matricules vides en None pour éviter les conflits d'unicité"""
         if self.matricule == '':
             self.matricule = None
+        self.set_search_keys()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], *self.SEARCH_KEYS}
         super().save(*args, **kwargs)
     
+    def set_search_keys(self):
+        """Recalcule les clés d'autocomplétion d'après l'utilisateur et le matricule"""
+        from .search import normalize
+        
+        for key, name in self.SEARCH_KEYS.items():
+            source = self if name == 'matricule' else self.user
+            setattr(self, key, normalize(getattr(source, name)))
+    
     def can_borrow(self):
         """Vérifie si l'utilisateur peut emprunter des livres"""
         return self.user_type in ['STUDENT', 'TEACHER', 'STAFF']
@@ -61,9 +93,15 @@ class Book(models.Model):
     category = models.CharField(max_length=100, blank=True, null=True, verbose_name="Catégorie")
     description = models.TextField(blank=True, null=True, verbose_name="Description")
     cover_image = models.ImageField(upload_to='book_covers/', blank=True, null=True, verbose_name="Image de couverture")
+    # Miniatures générées en tâche de fond (website.thumbnails) :
+    # {'source': nom de l'original, 'webp': {'160': nom, ...}, 'jpeg': {...}}
+    cover_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Miniatures de couverture")
     quantity = models.IntegerField(default=1, verbose_name="Quantité totale")
     available_quantity = models.IntegerField(default=1, verbose_name="Quantité disponible")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='AVAILABLE', verbose_name="Statut")
+    # Nombre d'emprunts depuis l'origine, incrémenté par borrow_book() ;
+    # commande reconcile_loan_counters en cas d'écart
+    total_loans = models.PositiveIntegerField(default=0, editable=False, verbose_name="Nombre d'emprunts")
     added_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='books_added')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -72,6 +110,13 @@ class Book(models.Model):
         verbose_name = "Livre"
         verbose_name_plural = "Livres"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='book_status_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='book_created_id_idx'),
+            models.Index(fields=['category'], name='book_category_idx'),
+            # Livres les plus empruntés : parcours de l'index, sans agrégat
+            models.Index(fields=['-total_loans', 'id'], name='book_total_loans_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} par {self.author}"
@@ -81,25 +126,112 @@ class Book(models.Model):
         return self.available_quantity > 0 and self.status == 'AVAILABLE'
     
     def borrow_book(self):
-        """Décrémente la quantité disponible lors d'un emprunt"""
-        if self.is_available():
-            self.available_quantity -= 1
-            if self.available_quantity == 0:
-                self.status = 'BORROWED'
-            self.save()
-            return True
-        return False
+        """Décrémente la quantité disponible lors d'un emprunt
+        
+        La décrémentation est un UPDATE conditionnel : la base refuse de
+        descendre sous zéro, même si plusieurs emprunts arrivent en même temps.
+        Le même UPDATE incrémente le compteur ``total_loans``.
+        """
+        updated = Book.objects.filter(
+            pk=self.pk,
+            available_quantity__gt=0,
+            status='AVAILABLE'
+        ).update(
+            available_quantity=F('available_quantity') - 1,
+            total_loans=F('total_loans') + 1,
+            status=Case(
+                When(available_quantity=1, then=Value('BORROWED')),
+                default=F('status'),
+            ),
+            updated_at=timezone.now(),
+        )
+        if updated:
+            rows_updated.send(sender=Book)
+        self.refresh_from_db(fields=['available_quantity', 'total_loans', 'status', 'updated_at'])
+        return updated == 1
     
     def return_book(self):
         """Incrémente la quantité disponible lors d'un retour"""
-        self.available_quantity += 1
-        if self.available_quantity > 0:
-            self.status = 'AVAILABLE'
-        self.save()
+        Book.objects.filter(pk=self.pk).update(
+            available_quantity=F('available_quantity') + 1,
+            status='AVAILABLE',
+            updated_at=timezone.now(),
+        )
+        rows_updated.send(sender=Book)
+        self.refresh_from_db(fields=['available_quantity', 'status', 'updated_at'])
     
     def borrowed_count(self):
         """Retourne le nombre d'exemplaires actuellement empruntés"""
         return self.quantity - self.available_quantity
+    
+    def _cover_variants(self, fmt):
+        """Miniatures d'un format, si elles correspondent à la couverture actuelle"""
+        if not self.cover_image or self.cover_variants.get('source') != self.cover_image.name:
+            return []
+        storage = self.cover_image.storage
+        variants = self.cover_variants.get(fmt, {})
+        return [(int(width), storage.url(name)) for width, name in sorted(variants.items(), key=lambda item: int(item[0]))]
+    
+    def _srcset(self, fmt):
+        return ', '.join(f'{url} {width}w' for width, url in self._cover_variants(fmt))
+    
+    @property
+    def cover_webp_srcset(self):
+        """srcset WebP de la couverture (vide tant que les miniatures ne sont pas prêtes)"""
+        return self._srcset('webp')
+    
+    @property
+    def cover_jpeg_srcset(self):
+        """srcset JPEG de la couverture (vide tant que les miniatures ne sont pas prêtes)"""
+        return self._srcset('jpeg')
+    
+    @property
+    def cover_thumbnail_url(self):
+        """Plus petite miniature JPEG, ou l'original si elles ne sont pas prêtes"""
+        variants = self._cover_variants('jpeg')
+        if variants:
+            return variants[0][1]
+        return self.cover_image.url if self.cover_image else ''
+
+
+class SearchDocumentField(models.TextField):
+    """Colonne plein texte : FTS5 sous SQLite, tsvector sous PostgreSQL"""
+
+
+@SearchDocumentField.register_lookup
+class FullTextMatch(models.Lookup):
+    """Lookup ``match`` : requête FTS5 (SQLite) ou tsquery (PostgreSQL)"""
+    lookup_name = 'match'
+    
+    def as_sql(self, compiler, connection):
+        raise NotSupportedError("La recherche plein texte n'est pas disponible sur cette base.")
+    
+    def as_sqlite(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+    
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} @@ to_tsquery('simple', {rhs})", [*lhs_params, *rhs_params]
+
+
+class BookSearchEntry(models.Model):
+    """Entrée de l'index plein texte d'un livre (table gérée par website.search)"""
+    book = models.OneToOneField(
+        Book,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_entry',
+    )
+    document = SearchDocumentField()
+    
+    class Meta:
+        managed = False
+        db_table = 'website_book_search'
 
 
 class Loan(models.Model):
@@ -111,7 +243,8 @@ class Loan(models.Model):
     ]
     
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='loans', verbose_name="Livre")
-    borrower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='loans', verbose_name="Emprunteur")
+    # Pas d'index simple : loan_borrower_status_date_idx commence par borrower
+    borrower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='loans', verbose_name="Emprunteur", db_index=False)
     librarian = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='loans_managed', verbose_name="Bibliothécaire")
     borrow_date = models.DateTimeField(default=timezone.now, verbose_name="Date d'emprunt")
     due_date = models.DateTimeField(verbose_name="Date de retour prévue")
@@ -125,6 +258,19 @@ class Loan(models.Model):
         verbose_name = "Emprunt"
         verbose_name_plural = "Emprunts"
         ordering = ['-borrow_date']
+        indexes = [
+            models.Index(fields=['status', 'due_date'], name='loan_status_due_idx'),
+            models.Index(fields=['borrower', 'status', 'borrow_date'], name='loan_borrower_status_date_idx'),
+            # Pagination par curseur sur (borrow_date, id)
+            models.Index(fields=['borrow_date', 'id'], name='loan_borrow_date_id_idx'),
+            models.Index(fields=['status', 'borrow_date'], name='loan_status_borrow_date_idx'),
+            # Index partiel : seuls les emprunts en cours, interrogés à chaque emprunt
+            models.Index(
+                fields=['book', 'borrower'],
+                condition=models.Q(status__in=['ACTIVE', 'OVERDUE']),
+                name='loan_open_book_borrower_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.book.title} - {self.borrower.get_full_name() or self.borrower.username}"
@@ -141,18 +287,126 @@ class Loan(models.Model):
         super().save(*args, **kwargs)
     
     def is_overdue(self):
-        """Vérifie si l'emprunt est en retard"""
-        return self.status == 'ACTIVE' and timezone.now() > self.due_date
+        """Vérifie si l'emprunt, toujours en cours, est en retard"""
+        return self.status in ('ACTIVE', 'OVERDUE') and timezone.now() > self.due_date
     
     def days_overdue(self):
-        """Calcule le nombre de jours de retard"""
-        if self.is_overdue():
-            return (timezone.now() - self.due_date).days
+        """Calcule le nombre de jours de retard (à ce jour, ou au retour pour un emprunt rendu)"""
+        end = self.return_date or timezone.now()
+        if end > self.due_date:
+            return (end - self.due_date).days
         return 0
     
+    @classmethod
+    def mark_overdue(cls, now=None, full=False):
+        """Passe en retard tous les emprunts en cours dont l'échéance est dépassée
+        
+        Un seul UPDATE ensembliste, sans appeler save() sur chaque emprunt. Le
+        point de reprise mémorise la date du dernier passage : les passages
+        suivants ne parcourent que les échéances tombées depuis (sauf si full).
+        Retourne le nombre d'emprunts passés en retard.
+        """
+        now = now or timezone.now()
+        with transaction.atomic():
+            checkpoint, _ = JobCheckpoint.objects.select_for_update().get_or_create(
+                name='mark_overdue'
+            )
+            loans = cls.objects.filter(status='ACTIVE', due_date__lt=now)
+            if checkpoint.position and not full:
+                loans = loans.filter(due_date__gte=checkpoint.position)
+            count = loans.update(status='OVERDUE', updated_at=now)
+            checkpoint.position = now
+            checkpoint.save(update_fields=['position', 'updated_at'])
+            if count:
+                rows_updated.send(sender=cls)
+        return count
+    
+    def checkout(self):
+        """Enregistre l'emprunt et réserve un exemplaire dans une seule transaction
+        
+        Retourne False sans rien enregistrer si aucun exemplaire n'est disponible.
+        """
+        with transaction.atomic():
+            if not self.book.borrow_book():
+                return False
+            self.save()
+        return True
+    
     def return_book(self):
-        """Marque le livre comme retourné"""
-        self.return_date = timezone.now()
+        """Marque le livre comme retourné
+        
+        Retourne False si l'emprunt avait déjà été retourné entre-temps.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            updated = Loan.objects.filter(pk=self.pk).exclude(status='RETURNED').update(
+                return_date=now,
+                status='RETURNED',
+                updated_at=now,
+            )
+            if not updated:
+                return False
+            rows_updated.send(sender=Loan)
+            self.book.return_book()
+        self.return_date = now
         self.status = 'RETURNED'
-        self.save()
-        self.book.return_book()
+        self.updated_at = now
+        return True
+
+
+class ArchivedLoan(models.Model):
+    """Emprunt rendu depuis longtemps, sorti de la table des emprunts (website.archive)
+    
+    Mêmes colonnes que Loan, id d'origine compris : les liens, curseurs de
+    pagination et exports restent valables après l'archivage.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='archived_loans', verbose_name="Livre")
+    # Pas d'index simple : archived_loan_borrower_idx commence par borrower
+    borrower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_loans', verbose_name="Emprunteur", db_index=False)
+    librarian = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+', verbose_name="Bibliothécaire")
+    borrow_date = models.DateTimeField(verbose_name="Date d'emprunt")
+    due_date = models.DateTimeField(verbose_name="Date de retour prévue")
+    return_date = models.DateTimeField(blank=True, null=True, verbose_name="Date de retour effective")
+    status = models.CharField(max_length=20, choices=Loan.STATUS_CHOICES, default='RETURNED', verbose_name="Statut")
+    notes = models.TextField(blank=True, null=True, verbose_name="Notes")
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = "Emprunt archivé"
+        verbose_name_plural = "Emprunts archivés"
+        ordering = ['-borrow_date']
+        indexes = [
+            # Historique d'un lecteur (my_loans), paginé sur (borrow_date, id)
+            models.Index(fields=['borrower', 'borrow_date', 'id'], name='archived_loan_borrower_idx'),
+            models.Index(fields=['borrow_date', 'id'], name='archived_loan_borrow_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.book.title} - {self.borrower.get_full_name() or self.borrower.username}"
+    
+    def is_overdue(self):
+        """Un emprunt archivé est rendu : jamais en retard"""
+        return False
+    
+    def days_overdue(self):
+        """Jours de retard au moment du retour"""
+        if self.return_date and self.return_date > self.due_date:
+            return (self.return_date - self.due_date).days
+        return 0
+
+
+class JobCheckpoint(models.Model):
+    """Point de reprise des tâches de maintenance périodiques"""
+    name = models.CharField(max_length=100, unique=True, verbose_name="Tâche")
+    position = models.DateTimeField(blank=True, null=True, verbose_name="Dernier passage")
+    offset = models.BigIntegerField(default=0, verbose_name="Lignes traitées")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Point de reprise"
+        verbose_name_plural = "Points de reprise"
+    
+    def __str__(self):
+        return f"{self.name} ({self.position})"
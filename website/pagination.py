@@ -0,0 +1,225 @@
+"""Pagination par curseur (keyset) pour les listes longues.
+
+Au lieu d'un OFFSET, chaque page repart de la clé de tri de la dernière ligne
+affichée : la base descend directement dans l'index, et la page 1000 coûte
+autant que la page 1. Les curseurs sont opaques (base64 d'un tableau JSON).
+
+Une liste répartie sur plusieurs tables (emprunts et archive) se pagine
+comme une seule : chaque table fournit sa page, et les pages sont fusionnées
+selon la même clé de tri.
+"""
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def encode_cursor(values):
+    """Encode les valeurs de la clé de tri en un curseur utilisable dans une URL"""
+    raw = json.dumps([v.isoformat() if hasattr(v, 'isoformat') else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    """Décode un curseur ; retourne None s'il est invalide"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(raw, list) or len(raw) != len(fields):
+            return None
+        return [field.to_python(value) for field, value in zip(fields, raw)]
+    except (ValueError, TypeError, binascii.Error, ValidationError):
+        return None
+
+
+class KeysetPage:
+    """Une page de résultats et les curseurs des pages voisines"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.next_query = ''
+        self.previous_query = ''
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """Découpe un queryset en pages selon une clé de tri unique
+
+    ``ordering`` doit se terminer par une colonne unique (en général ``id``)
+    pour que la clé identifie une seule ligne, par exemple
+    ``('-created_at', '-id')``.
+    """
+
+    def __init__(self, queryset, ordering, per_page=20):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.names = [name.lstrip('-') for name in self.ordering]
+        self.descending = [name.startswith('-') for name in self.ordering]
+        self.fields = [self._resolve(queryset, name) for name in self.names]
+
+    @staticmethod
+    def _resolve(queryset, name):
+        """Champ du modèle ou annotation (ex. rang de pertinence) servant de clé"""
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        opts = queryset.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def _key(self, obj):
+        return [getattr(obj, getattr(field, 'attname', None) or name) for field, name in zip(self.fields, self.names)]
+
+    def _seek(self, values, forward):
+        """Condition « strictement après (ou avant) la clé » en ordre lexicographique"""
+        conditions = []
+        for i, (name, descending) in enumerate(zip(self.names, self.descending)):
+            lookup = 'lt' if descending == forward else 'gt'
+            equal = {self.names[j]: values[j] for j in range(i)}
+            conditions.append(Q(**equal, **{f'{name}__{lookup}': values[i]}))
+        return reduce(or_, conditions)
+
+    def _query(self, after, before, queryset=None):
+        """Queryset de la page demandée et sens de lecture (True = à rebours)"""
+        queryset = self.queryset if queryset is None else queryset
+        after = decode_cursor(after, self.fields) if after else None
+        before = decode_cursor(before, self.fields) if before and not after else None
+
+        if before is not None:
+            reverse = [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+            queryset = queryset.filter(self._seek(before, forward=False)).order_by(*reverse)
+            return queryset[:self.per_page + 1], True, False
+        queryset = queryset.order_by(*self.ordering)
+        if after is not None:
+            queryset = queryset.filter(self._seek(after, forward=True))
+        return queryset[:self.per_page + 1], False, after is not None
+
+    def _page(self, rows, backwards, has_previous):
+        if backwards:
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_next = True
+        else:
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(self._key(rows[-1])) if rows and has_next else None,
+            previous_cursor=encode_cursor(self._key(rows[0])) if rows and has_previous else None,
+        )
+
+    def page(self, after=None, before=None):
+        """Retourne la page qui suit le curseur ``after`` ou précède ``before``"""
+        queryset, backwards, has_previous = self._query(after, before)
+        return self._page(list(queryset), backwards, has_previous)
+
+    async def apage(self, after=None, before=None):
+        """Variante asynchrone de ``page`` (ORM asynchrone)"""
+        queryset, backwards, has_previous = self._query(after, before)
+        return self._page([obj async for obj in queryset], backwards, has_previous)
+
+
+class MergedKeysetPaginator(KeysetPaginator):
+    """Pagine plusieurs querysets comme un seul, selon la même clé de tri
+
+    Les modèles doivent partager les colonnes de ``ordering`` et la dernière
+    doit rester unique d'une table à l'autre (ex. l'id d'origine d'un emprunt
+    archivé). Une requête par queryset et par page.
+    """
+
+    def __init__(self, querysets, ordering, per_page=20):
+        super().__init__(querysets[0], ordering, per_page)
+        self.querysets = querysets
+
+    def _merge(self, rows, backwards):
+        """Tri stable colonne par colonne, de la dernière à la première"""
+        for field, name, descending in reversed(list(zip(self.fields, self.names, self.descending))):
+            attname = getattr(field, 'attname', None) or name
+            rows.sort(key=lambda obj: getattr(obj, attname), reverse=descending != backwards)
+        return rows[:self.per_page + 1]
+
+    def page(self, after=None, before=None):
+        rows = []
+        for queryset in self.querysets:
+            queryset, backwards, has_previous = self._query(after, before, queryset)
+            rows += list(queryset)
+        return self._page(self._merge(rows, backwards), backwards, has_previous)
+
+    async def apage(self, after=None, before=None):
+        rows = []
+        for queryset in self.querysets:
+            queryset, backwards, has_previous = self._query(after, before, queryset)
+            rows += [obj async for obj in queryset]
+        return self._page(self._merge(rows, backwards), backwards, has_previous)
+
+
+def _paginator(queryset, ordering, per_page):
+    if isinstance(queryset, (list, tuple)):
+        return MergedKeysetPaginator(queryset, ordering, per_page)
+    return KeysetPaginator(queryset, ordering, per_page)
+
+
+def link_queries(request, page):
+    """Liens précédent/suivant qui conservent les autres paramètres GET
+
+    À appeler à chaque requête sur une page tirée du cache : les liens
+    dépendent des paramètres de la requête, pas seulement de la clé de cache.
+    """
+    if page.has_next:
+        params = request.GET.copy()
+        params.pop('before', None)
+        params['after'] = page.next_cursor
+        page.next_query = params.urlencode()
+    if page.has_previous:
+        params = request.GET.copy()
+        params.pop('after', None)
+        params['before'] = page.previous_cursor
+        page.previous_query = params.urlencode()
+    return page
+
+
+def paginate(request, queryset, ordering, per_page=20, links=True):
+    """Pagine un queryset d'après les paramètres ``after``/``before`` de la requête
+
+    Les liens précédent/suivant conservent les autres paramètres GET (filtres
+    de recherche) ; ``links=False`` les laisse à ``link_queries`` (page mise
+    en cache). Une liste de querysets est paginée comme un seul
+    (MergedKeysetPaginator).
+    """
+    page = _paginator(queryset, ordering, per_page).page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return link_queries(request, page) if links else page
+
+
+async def apaginate(request, queryset, ordering, per_page=20, links=True):
+    """Variante asynchrone de ``paginate``"""
+    page = await _paginator(queryset, ordering, per_page).apage(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return link_queries(request, page) if links else page
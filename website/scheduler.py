@@ -0,0 +1,73 @@
+"""Planificateur en processus pour les tâches de maintenance périodiques.
+
+Activé uniquement si OVERDUE_SWEEP_INTERVAL (en secondes) est défini dans les
+settings, et seulement dans les processus qui servent des requêtes (gunicorn,
+uvicorn, ``runserver``) : les commandes de gestion (migrate, test, shell,
+import_books...) ne le démarrent pas. Chaque worker a son thread, mais un
+verrou dans le cache (``cache.add``) réserve chaque passage à un seul d'entre
+eux ; le cache doit donc être partagé (Redis, ``REDIS_URL``). Pour plusieurs
+serveurs, préférer un cron qui lance ``manage.py mark_overdue_loans``.
+"""
+import logging
+import os
+import sys
+import threading
+
+from django.core.cache import cache
+from django.db import DatabaseError, close_old_connections
+
+logger = logging.getLogger(__name__)
+
+SWEEP_LOCK_KEY = 'website:overdue_sweep_lock'
+
+_started = False
+_lock = threading.Lock()
+
+
+def is_serving_process(argv=None, environ=None):
+    """Vrai si le processus sert des requêtes plutôt qu'une commande de gestion"""
+    argv = sys.argv if argv is None else argv
+    environ = os.environ if environ is None else environ
+    if not argv or os.path.basename(argv[0]) not in ('manage.py', 'django-admin'):
+        return True
+    if argv[1:2] != ['runserver']:
+        return False
+    # Avec l'autoreloader, seul le processus enfant (RUN_MAIN) sert les requêtes
+    return environ.get('RUN_MAIN') == 'true' or '--noreload' in argv
+
+
+def _run_overdue_sweep(interval, stop_event):
+    from .models import Loan
+
+    while not stop_event.wait(interval):
+        # Un seul worker par intervalle : le verrou expire avant le prochain passage
+        if not cache.add(SWEEP_LOCK_KEY, os.getpid(), max(interval - 1, 1)):
+            continue
+        close_old_connections()
+        try:
+            count = Loan.mark_overdue()
+        except DatabaseError:
+            logger.exception("Échec du passage en retard des emprunts")
+        else:
+            if count:
+                logger.info("%s emprunt(s) passé(s) en retard", count)
+        finally:
+            close_old_connections()
+
+
+def start_overdue_sweeper(interval):
+    """Démarre (une seule fois) le thread qui passe les emprunts en retard"""
+    global _started
+    with _lock:
+        if _started:
+            return None
+        _started = True
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=_run_overdue_sweep,
+        args=(interval, stop_event),
+        name='overdue-sweeper',
+        daemon=True,
+    )
+    thread.start()
+    return stop_event
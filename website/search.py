@@ -0,0 +1,237 @@
+"""Recherche plein texte dans le catalogue.
+
+Le backend est choisi d'après la base de données (ou BOOK_SEARCH_BACKEND) :
+
+- SQLite : table virtuelle FTS5 ``website_book_search`` (tokenizer unicode61
+  sans diacritiques, index de préfixes) ;
+- PostgreSQL : table ``website_book_search`` avec une colonne ``tsvector``
+  indexée en GIN ;
+- autres bases : repli sur des ``icontains`` (parcours complet de la table).
+
+Les deux tables utilisent ``rowid`` comme clé (= id du livre), ce qui permet
+de les joindre depuis Book via le modèle non géré BookSearchEntry. L'index
+est tenu à jour par les signaux post_save/post_delete de Book ; les écritures
+en masse appellent ``index_books`` elles-mêmes.
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models import Book
+
+SEARCH_TABLE = 'website_book_search'
+
+# Regroupe les tirets et espaces entre chiffres : « 978-2-07 » -> « 978207 »
+ISBN_SEPARATORS = re.compile(r'(?<=\d)[-\s](?=\d)')
+WORDS = re.compile(r'\w+')
+
+# Champs composant le texte indexé, dans l'ordre
+DOCUMENT_FIELDS = ('title', 'author', 'category', 'isbn')
+INDEXED_FIELDS = ('id', *DOCUMENT_FIELDS)
+
+
+def normalize(text):
+    """Minuscules sans accents (« Misérables » -> « miserables »)"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def search_terms(query):
+    """Découpe une saisie utilisateur en termes de recherche normalisés"""
+    return WORDS.findall(normalize(ISBN_SEPARATORS.sub('', query)))
+
+
+def document_text(values):
+    """Texte indexé à partir des valeurs de DOCUMENT_FIELDS"""
+    return ' '.join(filter(None, values))
+
+
+def book_document(book):
+    """Texte indexé pour un livre"""
+    return document_text(getattr(book, name) for name in DOCUMENT_FIELDS)
+
+
+class SearchBackend:
+    """Interface commune des backends de recherche"""
+
+    def __init__(self, using=None):
+        # Connexion de la base indexée (par défaut : la base principale)
+        self.connection = using or connection
+
+    def install(self, schema_editor):
+        """Crée les structures d'index (appelé par la migration)"""
+
+    def uninstall(self, schema_editor):
+        """Supprime les structures d'index"""
+
+    def index_books(self, books):
+        """Ajoute ou remplace les livres donnés dans l'index"""
+        self.index_documents([(book.pk, book_document(book)) for book in books])
+
+    def index_documents(self, documents):
+        """Ajoute ou remplace des couples (id du livre, texte) dans l'index"""
+
+    def remove_books(self, book_ids):
+        """Retire des livres de l'index"""
+
+    def rebuild(self, books=None, batch_size=2000):
+        """Reconstruit tout l'index à partir de la table des livres"""
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        if books is None:
+            books = Book.objects.using(self.connection.alias)
+        books = books.only(*INDEXED_FIELDS).order_by()
+        batch = []
+        for book in books.iterator(chunk_size=batch_size):
+            batch.append(book)
+            if len(batch) >= batch_size:
+                self.index_books(batch)
+                batch = []
+        if batch:
+            self.index_books(batch)
+
+    def search(self, queryset, query):
+        """Filtre le queryset et l'annote de ``search_rank`` (plus petit = plus pertinent)"""
+        raise NotImplementedError
+
+    def no_results(self, queryset):
+        """Résultat vide, annoté comme une vraie recherche"""
+        return queryset.annotate(search_rank=RawSQL('0', [], output_field=FloatField())).none()
+
+
+class IcontainsSearchBackend(SearchBackend):
+    """Recherche par sous-chaîne, sans index ni classement"""
+
+    def rebuild(self, books=None, batch_size=2000):
+        pass
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(author__icontains=query) |
+            Q(isbn__icontains=query) |
+            Q(category__icontains=query)
+        ).annotate(search_rank=RawSQL('0', [], output_field=FloatField()))
+
+
+class SQLiteFTSSearchBackend(SearchBackend):
+    """Table virtuelle FTS5, classement bm25"""
+
+    def install(self, schema_editor):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "document, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+
+    def uninstall(self, schema_editor):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+    def index_documents(self, documents):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(pk,) for pk, _ in documents])
+            cursor.executemany(f'INSERT INTO {SEARCH_TABLE} (rowid, document) VALUES (%s, %s)', documents)
+
+    def remove_books(self, book_ids):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(pk,) for pk in book_ids])
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return self.no_results(queryset)
+        # Chaque terme entre guillemets, en préfixe, tous obligatoires
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(search_entry__document__match=match).annotate(
+            search_rank=RawSQL(f'"{SEARCH_TABLE}"."rank"', [], output_field=FloatField())
+        )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Colonne tsvector indexée en GIN, classement ts_rank_cd"""
+
+    def install(self, schema_editor):
+        schema_editor.execute(
+            f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+            'rowid bigint PRIMARY KEY REFERENCES website_book (id) ON DELETE CASCADE, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx '
+            f'ON {SEARCH_TABLE} USING GIN (document)'
+        )
+
+    def uninstall(self, schema_editor):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+    def index_documents(self, documents):
+        # Les accents sont retirés en Python : pas besoin de l'extension unaccent
+        rows = [(pk, normalize(text)) for pk, text in documents]
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, document) VALUES (%s, to_tsvector('simple', %s)) "
+                "ON CONFLICT (rowid) DO UPDATE SET document = EXCLUDED.document",
+                rows,
+            )
+
+    def remove_books(self, book_ids):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = ANY(%s)', [list(book_ids)])
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return self.no_results(queryset)
+        tsquery = ' & '.join(f"'{term}':*" for term in terms)
+        return queryset.filter(search_entry__document__match=tsquery).annotate(
+            search_rank=RawSQL(
+                f'''-ts_rank_cd("{SEARCH_TABLE}"."document", to_tsquery('simple', %s))''',
+                [tsquery],
+                output_field=FloatField(),
+            )
+        )
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTSSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(using=None):
+    """Backend configuré (BOOK_SEARCH_BACKEND) ou déduit de la base de données"""
+    path = getattr(settings, 'BOOK_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)(using)
+    vendor = (using or connection).vendor
+    return VENDOR_BACKENDS.get(vendor, IcontainsSearchBackend)(using)
+
+
+def filter_books(books, query=None, category=None, status=None, **unused):
+    """Filtres du catalogue (recherche, catégorie, statut) : book_list, API et exports"""
+    if query:
+        # Recherche plein texte classée par pertinence
+        books = get_search_backend().search(books, query)
+    if category:
+        books = books.filter(category__icontains=category)
+    if status:
+        books = books.filter(status=status)
+    return books
+
+
+@receiver(post_save, sender=Book)
+def _index_saved_book(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and not set(update_fields) & set(INDEXED_FIELDS)):
+        return
+    get_search_backend().index_books([instance])
+
+
+@receiver(post_delete, sender=Book)
+def _remove_deleted_book(sender, instance, **kwargs):
+    get_search_backend().remove_books([instance.pk])
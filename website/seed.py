@@ -0,0 +1,188 @@
+"""Jeu de données synthétique (commande seed_library).
+
+Livres, lecteurs de chaque type et emprunts en cours, en retard et rendus,
+écrits par ``bulk_create`` dans une seule transaction. Les compteurs sont
+cohérents comme après de vrais emprunts : ``available_quantity`` déduit les
+emprunts en cours et en retard, ``total_loans`` compte tous les emprunts, un
+livre sans exemplaire libre est « Emprunté », et un lecteur n'a jamais deux
+emprunts ouverts du même livre.
+Le tirage est reproductible avec la même graine.
+"""
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Book, Loan, UserProfile
+from .search import get_search_backend
+from .signals import rows_updated
+
+# Mot de passe de tous les comptes générés
+SEED_PASSWORD = 'biblio1234'
+BATCH_SIZE = 2000
+LOAN_DAYS = 14
+
+WORDS = [
+    'histoire', 'prince', 'misérables', 'étranger', 'été', 'forêt', 'mémoire', 'république',
+    'économie', 'réseau', 'données', 'algèbre', 'physique', 'chimie', 'littérature', 'poésie',
+    'théâtre', 'roman', 'voyage', 'océan', 'société', 'électricité', 'géographie', 'philosophie',
+    'médecine', 'droit', 'fleuve', 'montagne', 'lumière', 'nuit', 'guerre', 'paix', 'éducation',
+]
+AUTHORS = [
+    'Victor Hugo', 'Émile Zola', 'Albert Camus', 'Jean-Paul Sartre', 'Simone de Beauvoir',
+    'Léopold Sédar Senghor', 'Aimé Césaire', 'Mongo Beti', 'Ferdinand Oyono', 'Alexandre Dumas',
+    'Mariama Bâ', 'Calixthe Beyala', 'Ahmadou Kourouma', 'Cheikh Hamidou Kane', 'Marie NDiaye',
+]
+CATEGORIES = ['Roman', 'Poésie', 'Théâtre', 'Sciences', 'Histoire', 'Droit', 'Médecine', 'Informatique', 'Économie']
+PUBLISHERS = ['Gallimard', 'Présence Africaine', 'Hachette', 'Clé', 'L\'Harmattan', 'Dunod']
+FIRST_NAMES = ['Awa', 'Jean', 'Fatou', 'Paul', 'Aïcha', 'Samuel', 'Mireille', 'Idriss', 'Clarisse', 'Moussa']
+LAST_NAMES = ['Diallo', 'Mbarga', 'Ngono', 'Traoré', 'Kamga', 'Fotso', 'Ndiaye', 'Essomba', 'Tchoua', 'Bello']
+
+
+def _next_number(model, field='id'):
+    return (model.objects.aggregate(last=Max(field))['last'] or 0) + 1
+
+
+def make_books(rng, count):
+    """Livres non enregistrés, ISBN à la suite des livres existants"""
+    start = _next_number(Book)
+    return [
+        Book(
+            title=' '.join(rng.sample(WORDS, 3)).capitalize(),
+            author=rng.choice(AUTHORS),
+            isbn=f'979{start + i:010d}',
+            publisher=rng.choice(PUBLISHERS),
+            publication_year=rng.randint(1950, 2025),
+            category=rng.choice(CATEGORIES),
+            description=' '.join(rng.choices(WORDS, k=20)).capitalize() + '.',
+            quantity=rng.randint(1, 5),
+        )
+        for i in range(count)
+    ]
+
+
+def make_users(rng, counts):
+    """Utilisateurs et profils enregistrés ; retourne {user_type: [id, ...]}"""
+    password = make_password(SEED_PASSWORD)
+    start = _next_number(User)
+    users, types = [], []
+    for user_type, count in counts.items():
+        for _ in range(count):
+            number = start + len(users)
+            users.append(User(
+                username=f'{user_type.lower()}{number}',
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                email=f'{user_type.lower()}{number}@example.org',
+                password=password,
+            ))
+            types.append(user_type)
+    users = User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+    profiles = [UserProfile(user=user, user_type=user_type) for user, user_type in zip(users, types)]
+    # bulk_create n'appelle pas save() : clés d'autocomplétion calculées ici
+    for profile in profiles:
+        profile.set_search_keys()
+    UserProfile.objects.bulk_create(profiles, batch_size=BATCH_SIZE)
+    ids = {user_type: [] for user_type in counts}
+    for user, user_type in zip(users, types):
+        ids[user_type].append(user.pk)
+    return ids
+
+
+def allocate_open_loans(rng, books, borrowers, count):
+    """Couples (index du livre, emprunteur) des emprunts ouverts
+
+    Chaque emprunt ouvert prend un exemplaire ; un lecteur n'emprunte pas deux
+    fois le même livre.
+    """
+    copies = [index for index, book in enumerate(books) for _ in range(book.quantity)]
+    if count > len(copies):
+        raise ValueError(f'{count} emprunts ouverts demandés pour {len(copies)} exemplaires')
+    rng.shuffle(copies)
+    taken = set()
+    pairs = []
+    for index in copies:
+        if len(pairs) == count:
+            break
+        for _ in range(10):
+            borrower = rng.choice(borrowers)
+            if (index, borrower) not in taken:
+                taken.add((index, borrower))
+                pairs.append((index, borrower))
+                break
+    if len(pairs) < count:
+        raise ValueError(f'Pas assez de lecteurs pour {count} emprunts ouverts')
+    return pairs
+
+
+def seed_library(books=1000, users=None, active=200, overdue=50, returned=1000, seed=None):
+    """Crée le jeu de données ; retourne le nombre d'objets créés par type
+
+    ``users`` : nombre de comptes par user_type (STUDENT, TEACHER, STAFF,
+    LIBRARIAN).
+    """
+    rng = random.Random(seed)
+    users = users if users is not None else {'STUDENT': 200, 'TEACHER': 20, 'STAFF': 10, 'LIBRARIAN': 3}
+    now = timezone.now()
+
+    with transaction.atomic():
+        user_ids = make_users(rng, users)
+        borrowers = [pk for user_type, ids in user_ids.items() if user_type != 'LIBRARIAN' for pk in ids]
+        librarians = user_ids.get('LIBRARIAN') or [None]
+        if (active or overdue or returned) and not borrowers:
+            raise ValueError('Aucun lecteur pour les emprunts')
+
+        new_books = make_books(rng, books)
+        open_loans = allocate_open_loans(rng, new_books, borrowers, active + overdue)
+        returned_loans = [rng.randrange(len(new_books)) for _ in range(returned if new_books else 0)]
+        for book in new_books:
+            book.available_quantity = book.quantity
+        for index, _ in open_loans:
+            new_books[index].available_quantity -= 1
+        for index in [index for index, _ in open_loans] + returned_loans:
+            new_books[index].total_loans += 1
+        for book in new_books:
+            book.status = 'AVAILABLE' if book.available_quantity else 'BORROWED'
+        new_books = Book.objects.bulk_create(new_books, batch_size=BATCH_SIZE)
+
+        loans = []
+        for position, (index, borrower) in enumerate(open_loans):
+            if position < active:
+                borrow_date = now - timedelta(days=rng.uniform(0, LOAN_DAYS - 1))
+                status = 'ACTIVE'
+            else:
+                borrow_date = now - timedelta(days=rng.uniform(LOAN_DAYS + 1, 60))
+                status = 'OVERDUE'
+            loans.append(Loan(
+                book_id=new_books[index].pk, borrower_id=borrower, librarian_id=rng.choice(librarians),
+                borrow_date=borrow_date, due_date=borrow_date + timedelta(days=LOAN_DAYS), status=status,
+            ))
+        for index in returned_loans:
+            # Rendu au plus LOAN_DAYS + 7 jours après l'emprunt : jamais dans le futur
+            borrow_date = now - timedelta(days=rng.uniform(LOAN_DAYS + 8, 365))
+            loans.append(Loan(
+                book_id=new_books[index].pk, borrower_id=rng.choice(borrowers),
+                librarian_id=rng.choice(librarians), borrow_date=borrow_date,
+                due_date=borrow_date + timedelta(days=LOAN_DAYS),
+                return_date=borrow_date + timedelta(days=rng.uniform(1, LOAN_DAYS + 7)), status='RETURNED',
+            ))
+        Loan.objects.bulk_create(loans, batch_size=BATCH_SIZE)
+
+        # Pas de post_save : index et caches à la main
+        backend = get_search_backend()
+        for offset in range(0, len(new_books), BATCH_SIZE):
+            backend.index_books(new_books[offset:offset + BATCH_SIZE])
+        rows_updated.send(sender=Book)
+        rows_updated.send(sender=Loan)
+
+    return {
+        'books': len(new_books),
+        'users': sum(users.values()),
+        'active': active,
+        'overdue': overdue,
+        'returned': len(returned_loans),
+    }
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Envoyé après une mise à jour ensembliste (QuerySet.update, bulk_create...)
+# qui ne déclenche ni post_save ni post_delete. sender = classe du modèle.
+rows_updated = Signal()
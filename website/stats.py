@@ -0,0 +1,172 @@
+"""Statistiques du tableau de bord, calculées en quelques agrégats SQL.
+
+L'instantané est mis en cache et invalidé à chaque écriture sur les livres,
+les emprunts et les utilisateurs ; LIBRARY_STATS_TTL borne sa durée de vie
+pour les écritures faites hors de l'ORM.
+
+Livres les plus empruntés : depuis l'origine, lecture de l'index sur le
+compteur ``Book.total_loans`` ; sur une période (30 derniers jours...),
+agrégat limité aux emprunts de la période, dont le top N est gardé en cache
+POPULAR_BOOKS_TTL secondes.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ArchivedLoan, Book, Loan, UserProfile
+from .signals import rows_updated
+
+STATS_CACHE_KEY = 'website:library_stats'
+
+BORROWER_TYPES = ['STUDENT', 'TEACHER', 'STAFF']
+
+
+@dataclass
+class LibraryStats:
+    """Instantané des compteurs affichés sur le tableau de bord"""
+    # Livres
+    total_books: int = 0
+    available_books: int = 0
+    borrowed_books: int = 0
+    maintenance_books: int = 0
+    total_copies: int = 0
+    total_copies_available: int = 0
+    # Emprunts
+    active_loans: int = 0
+    overdue_loans: int = 0
+    returned_loans: int = 0
+    total_loans: int = 0
+    # Utilisateurs
+    total_users: int = 0
+    total_borrowers: int = 0
+    total_librarians: int = 0
+    computed_at: datetime = field(default_factory=timezone.now)
+
+    @classmethod
+    def compute(cls):
+        """Calcule tous les compteurs en quatre requêtes d'agrégation"""
+        books = Book.objects.aggregate(
+            total_books=Count('id'),
+            available_books=Count('id', filter=Q(status='AVAILABLE')),
+            borrowed_books=Count('id', filter=Q(status='BORROWED')),
+            maintenance_books=Count('id', filter=Q(status='MAINTENANCE')),
+            total_copies=Coalesce(Sum('quantity'), 0),
+            total_copies_available=Coalesce(Sum('available_quantity'), 0),
+        )
+        loans = Loan.objects.aggregate(
+            active_loans=Count('id', filter=Q(status='ACTIVE')),
+            overdue_loans=Count('id', filter=Q(status='OVERDUE')),
+            returned_loans=Count('id', filter=Q(status='RETURNED')),
+            total_loans=Count('id'),
+        )
+        # L'archive ne contient que des emprunts rendus
+        archived = ArchivedLoan.objects.count()
+        loans['returned_loans'] += archived
+        loans['total_loans'] += archived
+        users = User.objects.aggregate(
+            total_users=Count('id'),
+            total_borrowers=Count('id', filter=Q(profile__user_type__in=BORROWER_TYPES)),
+            total_librarians=Count('id', filter=Q(profile__user_type='LIBRARIAN')),
+        )
+        return cls(**books, **loans, **users)
+
+
+def get_library_stats():
+    """Retourne l'instantané en cache, recalculé s'il a expiré ou été invalidé"""
+    stats = cache.get(STATS_CACHE_KEY)
+    if stats is None:
+        stats = LibraryStats.compute()
+        cache.set(STATS_CACHE_KEY, stats, getattr(settings, 'LIBRARY_STATS_TTL', 60))
+    return stats
+
+
+def popular_books(days=None, limit=5):
+    """Livres les plus empruntés, avec leur nombre d'emprunts (``loan_count``)
+
+    ``days`` : emprunts des N derniers jours seulement ; None : depuis l'origine.
+    """
+    if days is None:
+        books = list(Book.objects.filter(total_loans__gt=0).order_by('-total_loans', 'id')[:limit])
+        for book in books:
+            book.loan_count = book.total_loans
+        return books
+
+    key = f'website:popular_books:{days}:{limit}'
+    books = cache.get(key)
+    if books is None:
+        since = timezone.now() - timedelta(days=days)
+        books = list(
+            Book.objects.filter(loans__borrow_date__gte=since)
+            .annotate(loan_count=Count('loans'))
+            .order_by('-loan_count', 'id')[:limit]
+        )
+        cache.set(key, books, getattr(settings, 'POPULAR_BOOKS_TTL', 600))
+    return books
+
+
+def loan_count_subquery():
+    """Nombre d'emprunts du livre courant, archivés compris, pour un UPDATE ou un filtre"""
+    live, archived = (
+        Coalesce(
+            Subquery(
+                model.objects.filter(book=OuterRef('pk')).order_by()
+                .values('book').annotate(count=Count('id')).values('count')
+            ),
+            0,
+        )
+        for model in (Loan, ArchivedLoan)
+    )
+    return live + archived
+
+
+def reconcile_loan_counters(batch_size=5000):
+    """Recalcule ``Book.total_loans`` d'après les emprunts et leur archive
+
+    Une requête UPDATE par tranche d'id, limitée aux livres dont le compteur
+    est faux ; retourne le nombre de livres corrigés.
+    """
+    fixed = 0
+    last_id = 0
+    while True:
+        ids = list(
+            Book.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        last_id = ids[-1]
+        with transaction.atomic():
+            fixed += Book.objects.filter(pk__gte=ids[0], pk__lte=last_id).exclude(
+                total_loans=loan_count_subquery()
+            ).update(total_loans=loan_count_subquery())
+    if fixed:
+        rows_updated.send(sender=Book)
+    return fixed
+
+
+def invalidate_library_stats():
+    """Supprime l'instantané une fois la transaction en cours validée"""
+    transaction.on_commit(lambda: cache.delete(STATS_CACHE_KEY))
+
+
+@receiver([post_save, post_delete, rows_updated], sender=Book)
+@receiver([post_save, post_delete, rows_updated], sender=Loan)
+@receiver([post_save, post_delete], sender=UserProfile)
+@receiver(post_delete, sender=User)
+def _invalidate_on_write(sender, **kwargs):
+    invalidate_library_stats()
+
+
+@receiver(post_save, sender=User)
+def _invalidate_on_new_user(sender, created, **kwargs):
+    # Les connexions mettent à jour last_login : seules les créations comptent
+    if created:
+        invalidate_library_stats()
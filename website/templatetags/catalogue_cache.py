@@ -0,0 +1,42 @@
+"""Fragments de templates mis en cache dans la génération du catalogue
+
+    {% load catalogue_cache %}
+    {% catalogue_fragment "book_grid" page_key is_librarian %}
+        ...
+    {% endcatalogue_fragment %}
+
+Le fragment est rendu une fois par combinaison du nom et des valeurs qui
+suivent, puis resservi jusqu'à la prochaine écriture sur les livres ou les
+emprunts (voir website.cache).
+"""
+from django import template
+
+from website.cache import CATALOGUE, get_or_compute, make_key
+
+register = template.Library()
+
+
+class CatalogueFragmentNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        values = [variable.resolve(context) for variable in self.vary_on]
+        key = f'fragment:{self.name.resolve(context)}:{make_key(*values)}'
+        return get_or_compute(CATALOGUE, key, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def catalogue_fragment(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' attend au moins un nom de fragment")
+    nodelist = parser.parse(('endcatalogue_fragment',))
+    parser.delete_first_token()
+    return CatalogueFragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        [parser.compile_filter(bit) for bit in bits[2:]],
+    )
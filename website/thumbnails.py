@@ -0,0 +1,144 @@
+"""Miniatures des couvertures de livres.
+
+Quand un livre est enregistré avec une nouvelle couverture (BookForm, admin),
+les miniatures WebP et JPEG sont calculées après le commit dans un pool de
+processus (THUMBNAIL_WORKERS), hors du thread de la requête. Le résultat est
+rangé dans ``Book.cover_variants`` ; en attendant, les templates affichent
+l'original. La commande ``generate_thumbnails`` traite les couvertures
+existantes.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .imaging import FORMATS, render_variants
+from .models import Book
+from .signals import rows_updated
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR = 'book_covers/thumbs'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def cover_storage():
+    return Book._meta.get_field('cover_image').storage
+
+
+def get_executor():
+    """Pool de processus partagé, créé au premier besoin"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn : pas de fork d'un processus serveur multi-thread
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def needs_thumbnails(book):
+    """Le livre a une couverture dont les miniatures n'existent pas encore"""
+    return bool(book.cover_image) and book.cover_variants.get('source') != book.cover_image.name
+
+
+def read_cover(name):
+    with cover_storage().open(name, 'rb') as cover:
+        return cover.read()
+
+
+def delete_variant_files(variants):
+    storage = cover_storage()
+    for fmt in FORMATS:
+        for name in (variants or {}).get(fmt, {}).values():
+            storage.delete(name)
+
+
+def store_variants(book_id, source_name, rendered):
+    """Enregistre les miniatures et les rattache au livre
+
+    Si la couverture a changé entre-temps, les fichiers produits sont
+    supprimés et le livre n'est pas modifié. Retourne True si le livre a été
+    mis à jour.
+    """
+    storage = cover_storage()
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    variants = {'source': source_name}
+    for fmt, sizes in rendered.items():
+        extension = FORMATS[fmt][1]
+        variants[fmt] = {
+            str(width): storage.save(f'{THUMBNAIL_DIR}/{stem}-{width}.{extension}', ContentFile(data))
+            for width, data in sizes.items()
+        }
+
+    previous = Book.objects.filter(pk=book_id).values_list('cover_variants', flat=True).first()
+    updated = Book.objects.filter(pk=book_id, cover_image=source_name).update(
+        cover_variants=variants, updated_at=timezone.now(),
+    )
+    if updated:
+        # Pages en cache et ETag de l'API référencent la couverture affichée
+        rows_updated.send(sender=Book)
+    delete_variant_files(previous if updated else variants)
+    return bool(updated)
+
+
+def generate_thumbnails(book_id, source_name):
+    """Calcule et enregistre les miniatures dans le processus courant"""
+    return store_variants(book_id, source_name, render_variants(read_cover(source_name)))
+
+
+def schedule_thumbnails(book_id, source_name):
+    """Confie le redimensionnement au pool ; synchrone si THUMBNAIL_WORKERS vaut 0"""
+    if not settings.THUMBNAIL_WORKERS:
+        generate_thumbnails(book_id, source_name)
+        return
+
+    future = get_executor().submit(render_variants, read_cover(source_name))
+    requesting_thread = threading.current_thread()
+
+    def done(future):
+        # En général exécuté par un thread du pool, qui ferme sa propre connexion
+        try:
+            store_variants(book_id, source_name, future.result())
+        except Exception:
+            logger.exception('Miniatures impossibles pour le livre %s (%s)', book_id, source_name)
+        finally:
+            if threading.current_thread() is not requesting_thread:
+                connections.close_all()
+
+    future.add_done_callback(done)
+
+
+@receiver(post_save, sender=Book)
+def _schedule_cover_thumbnails(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if needs_thumbnails(instance):
+        book_id, source_name = instance.pk, instance.cover_image.name
+        transaction.on_commit(lambda: schedule_thumbnails(book_id, source_name))
+    elif not instance.cover_image and instance.cover_variants:
+        # Couverture retirée : les miniatures n'ont plus lieu d'être
+        delete_variant_files(instance.cover_variants)
+        instance.updated_at = timezone.now()
+        Book.objects.filter(pk=instance.pk).update(cover_variants={}, updated_at=instance.updated_at)
+        instance.cover_variants = {}
+        rows_updated.send(sender=Book)
+
+
+@receiver(post_delete, sender=Book)
+def _delete_cover_thumbnails(sender, instance, **kwargs):
+    if instance.cover_variants:
+        variants = instance.cover_variants
+        transaction.on_commit(lambda: delete_variant_files(variants))
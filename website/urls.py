@@ -1,12 +1,22 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import api, async_views, views
+
+
+def catalogue_patterns(module):
+    """Pages de consultation, servies par ``views`` ou ``async_views``"""
+    return [
+        path('', module.home, name='home'),
+        path('books/', module.book_list, name='book_list'),
+        path('books/<int:pk>/', module.book_detail, name='book_detail'),
+        path('my-loans/', module.my_loans, name='my_loans'),
+    ]
+
 
 urlpatterns = [
-    # Pages publiques
-    path('', views.home, name='home'),
-    path('books/', views.book_list, name='book_list'),
-    path('books/<int:pk>/', views.book_detail, name='book_detail'),
+    # Pages publiques (variantes asynchrones sous ASGI)
+    *catalogue_patterns(async_views if settings.ASYNC_VIEWS else views),
     
     # Authentification
     path('register/', views.register, name='register'),
@@ -17,15 +27,25 @@ urlpatterns = [
     path('books/add/', views.add_book, name='add_book'),
     path('books/<int:pk>/edit/', views.edit_book, name='edit_book'),
     path('books/<int:pk>/delete/', views.delete_book, name='delete_book'),
+    path('books/export/', views.export_books, name='export_books'),
     
     # Gestion des emprunts
     path('loans/', views.loan_list, name='loan_list'),
     path('loans/create/', views.create_loan, name='create_loan'),
+    path('loans/bulk/', views.create_loans_bulk, name='create_loans_bulk'),
     path('loans/<int:loan_id>/return/', views.return_book, name='return_book'),
-    path('my-loans/', views.my_loans, name='my_loans'),
+    path('loans/return/', views.return_loans_bulk, name='return_loans_bulk'),
     path('books/<int:pk>/borrow/', views.borrow_book, name='borrow_book'),
+    path('loans/export/', views.export_loans, name='export_loans'),
+    path('loans/autocomplete/books/', views.autocomplete_books, name='autocomplete_books'),
+    path('loans/autocomplete/borrowers/', views.autocomplete_borrowers, name='autocomplete_borrowers'),
     
     # Tableau de bord (bibliothécaires)
     path('dashboard/', views.dashboard, name='dashboard'),
+    
+    # API JSON en lecture seule (bornes, application mobile)
+    path('api/books/', api.api_books, name='api_books'),
+    path('api/books/<int:pk>/', api.api_book_detail, name='api_book_detail'),
+    path('api/availability/', api.api_availability, name='api_availability'),
 ]
 
@@ -1,12 +1,39 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import login, logout, authenticate
 from django.contrib import messages
-from django.db.models import Q
 from django.utils import timezone
+from dataclasses import asdict
 from .models import Book, Loan, UserProfile
-from .forms import BookForm, LoanForm, BookSearchForm, UserRegistrationForm
+from .forms import BookForm, BulkLoanForm, BulkReturnForm, LoanForm, BookSearchForm, LoanExportForm, UserRegistrationForm
+from .archive import loan_history, loan_querysets
+from .checkout import CheckoutConflict, bulk_checkout, bulk_return
+from .autocomplete import (
+    AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_LIMIT, MIN_TERM_LENGTH,
+    book_label, borrower_label, search_books, search_users,
+)
+from .exports import FORMATS, book_rows, loan_rows, stream
+from .cache import CATALOGUE, get_or_compute, make_key
+from .pagination import link_queries, paginate
+from .search import filter_books
+from .stats import get_library_stats, popular_books
 from django.contrib.auth.forms import AuthenticationForm
+from django.contrib.auth.models import User
+
+
+# Nombre maximum d'emprunts en retard listés sur le tableau de bord
+DASHBOARD_OVERDUE_LIMIT = 20
+
+# Période du classement « les plus empruntés récemment » (jours)
+POPULAR_DAYS = 30
+
+# Taille des pages des listes (pagination par curseur)
+BOOKS_PER_PAGE = 24
+LOANS_PER_PAGE = 50
+
+# Paramètres qui déterminent le contenu d'une page du catalogue
+BOOK_LIST_PARAMS = ('query', 'category', 'status', 'after', 'before')
 
 
 # Fonctions de vérification des permissions
@@ -23,45 +50,37 @@ def can_borrow(user):
 # Vues publiques
 def home(request):
     """Page d'accueil"""
-    recent_books = Book.objects.filter(status='AVAILABLE')[:6]
-    total_books = Book.objects.count()
-    available_books = Book.objects.filter(status='AVAILABLE').count()
-    
-    context = {
-        'recent_books': recent_books,
-        'total_books': total_books,
-        'available_books': available_books,
-    }
+    # Mêmes données pour tous les visiteurs : en cache jusqu'à la prochaine écriture
+    context = get_or_compute(CATALOGUE, 'home', lambda: {
+        'recent_books': list(Book.objects.filter(status='AVAILABLE')[:6]),
+        'total_books': Book.objects.count(),
+        'available_books': Book.objects.filter(status='AVAILABLE').count(),
+    })
     return render(request, 'website/home.html', context)
 
 
 def book_list(request):
     """Liste de tous les livres avec recherche"""
-    books = Book.objects.all()
     form = BookSearchForm(request.GET)
     
-    if form.is_valid():
-        query = form.cleaned_data.get('query')
-        category = form.cleaned_data.get('category')
-        status = form.cleaned_data.get('status')
-        
-        if query:
-            books = books.filter(
-                Q(title__icontains=query) |
-                Q(author__icontains=query) |
-                Q(isbn__icontains=query) |
-                Q(category__icontains=query)
-            )
-        
-        if category:
-            books = books.filter(category__icontains=category)
+    def search():
+        books = Book.objects.all()
+        if form.is_valid():
+            books = filter_books(books, **form.cleaned_data)
         
-        if status:
-            books = books.filter(status=status)
+        if 'search_rank' in books.query.annotations:
+            return paginate(request, books, ('search_rank', 'id'), BOOKS_PER_PAGE, links=False)
+        return paginate(request, books, ('-created_at', '-id'), BOOKS_PER_PAGE, links=False)
+    
+    # Une page de résultats par combinaison de filtres et de curseur ; les
+    # liens de navigation suivent les paramètres de chaque requête
+    page_key = make_key(*(request.GET.get(name, '') for name in BOOK_LIST_PARAMS))
+    books = link_queries(request, get_or_compute(CATALOGUE, f'book_list:{page_key}', search))
     
     context = {
         'books': books,
         'form': form,
+        'page_key': page_key,
     }
     return render(request, 'website/book_list.html', context)
 
@@ -201,10 +220,8 @@ def create_loan(request):
             loan = form.save(commit=False)
             loan.librarian = request.user
             
-            # Vérifier que le livre est disponible
-            if loan.book.is_available():
-                loan.save()
-                loan.book.borrow_book()
+            # Réserver un exemplaire et enregistrer l'emprunt de façon atomique
+            if loan.checkout():
                 messages.success(
                     request,
                     f'Emprunt créé : "{loan.book.title}" pour {loan.borrower.get_full_name()}'
@@ -219,19 +236,58 @@ def create_loan(request):
 
 
 @login_required
-def loan_list(request):
-    """Liste des emprunts"""
-    if hasattr(request.user, 'profile') and request.user.profile.is_librarian():
-        # Les bibliothécaires voient tous les emprunts
-        loans = Loan.objects.all()
+@user_passes_test(is_librarian)
+def create_loans_bulk(request):
+    """Emprunts en série : un lot d'ISBN scannés, enregistré en une transaction"""
+    lines = None
+    if request.method == 'POST':
+        form = BulkLoanForm(request.POST)
+        if form.is_valid():
+            lines = form.cleaned_data['lines']
+            try:
+                loans = bulk_checkout(lines, request.user, form.cleaned_data['due_date'], form.cleaned_data['notes'])
+            except CheckoutConflict:
+                messages.error(request, 'Le stock a changé pendant l\'enregistrement : aucun emprunt créé, renvoyez le lot.')
+                lines = None
+            else:
+                failed = [line for line in lines if not line.ok]
+                if loans:
+                    messages.success(request, f'{len(loans)} emprunt(s) créé(s).')
+                if failed:
+                    messages.warning(request, f'{len(failed)} ligne(s) refusée(s), reprises ci-dessous.')
+                # Nouveau lot prérempli avec les lignes refusées, à corriger
+                form = BulkLoanForm(initial={
+                    'borrower': form.cleaned_data['borrower'],
+                    'due_date': form.cleaned_data['due_date'],
+                    'notes': form.cleaned_data['notes'],
+                    'lines': '\n'.join(line.text for line in failed),
+                })
     else:
-        # Les autres ne voient que leurs emprunts
-        loans = Loan.objects.filter(borrower=request.user)
+        form = BulkLoanForm()
     
-    # Filtrer par statut si demandé
+    return render(request, 'website/loan_bulk_form.html', {'form': form, 'lines': lines})
+
+
+@login_required
+def loan_list(request):
+    """Liste des emprunts"""
+    # Emprunts rendus ou sans filtre : l'archive est paginée avec la table
+    # des emprunts (pagination fusionnée)
     status = request.GET.get('status')
-    if status:
-        loans = loans.filter(status=status)
+    # Les bibliothécaires voient tous les emprunts, les autres les leurs
+    librarian = hasattr(request.user, 'profile') and request.user.profile.is_librarian()
+    
+    loans = []
+    for queryset in loan_querysets(status):
+        if not librarian:
+            queryset = queryset.filter(borrower=request.user)
+        # Filtrer par statut si demandé
+        if status:
+            queryset = queryset.filter(status=status)
+        # Tout ce que le template affiche, chargé avec les emprunts
+        loans.append(queryset.select_related('book', 'borrower', 'borrower__profile'))
+    
+    loans = paginate(request, loans, ('-borrow_date', '-id'), LOANS_PER_PAGE)
     
     context = {
         'loans': loans,
@@ -243,11 +299,10 @@ def loan_list(request):
 @user_passes_test(is_librarian)
 def return_book(request, loan_id):
     """Marquer un livre comme retourné (bibliothécaires uniquement)"""
-    loan = get_object_or_404(Loan, pk=loan_id)
+    loan = get_object_or_404(Loan.objects.select_related('book', 'borrower'), pk=loan_id)
     
     if request.method == 'POST':
-        if loan.status != 'RETURNED':
-            loan.return_book()
+        if loan.status != 'RETURNED' and loan.return_book():
             messages.success(
                 request,
                 f'Le livre "{loan.book.title}" a été retourné par {loan.borrower.get_full_name()}'
@@ -260,18 +315,44 @@ def return_book(request, loan_id):
     return render(request, 'website/loan_return_confirm.html', {'loan': loan})
 
 
+@login_required
+@user_passes_test(is_librarian)
+def return_loans_bulk(request):
+    """Retours en série : numéros d'emprunt ou ISBN scannés, enregistrés en une transaction"""
+    lines = late = None
+    if request.method == 'POST':
+        form = BulkReturnForm(request.POST)
+        if form.is_valid():
+            lines = form.cleaned_data['lines']
+            try:
+                loans = bulk_return(lines)
+            except CheckoutConflict:
+                messages.error(request, 'Un emprunt a changé pendant l\'enregistrement : aucun retour enregistré, renvoyez le lot.')
+                lines = None
+            else:
+                failed = [line for line in lines if not line.ok]
+                late = sorted((loan for loan in loans if loan.days_overdue()), key=lambda loan: -loan.days_overdue())
+                if loans:
+                    messages.success(request, f'{len(loans)} retour(s) enregistré(s), dont {len(late)} en retard.')
+                if failed:
+                    messages.warning(request, f'{len(failed)} ligne(s) refusée(s), reprises ci-dessous.')
+                form = BulkReturnForm(initial={'lines': '\n'.join(line.text for line in failed)})
+    else:
+        form = BulkReturnForm()
+    
+    return render(request, 'website/loan_bulk_return.html', {'form': form, 'lines': lines, 'late': late})
+
+
 @login_required
 def my_loans(request):
     """Mes emprunts en cours et historique"""
     active_loans = Loan.objects.filter(
         borrower=request.user,
         status__in=['ACTIVE', 'OVERDUE']
-    )
+    ).select_related('book')
     
-    past_loans = Loan.objects.filter(
-        borrower=request.user,
-        status='RETURNED'
-    )
+    # Historique : emprunts rendus récents et archive, paginés ensemble
+    past_loans = paginate(request, loan_history(request.user), ('-borrow_date', '-id'), LOANS_PER_PAGE)
     
     context = {
         'active_loans': active_loans,
@@ -305,8 +386,8 @@ def borrow_book(request, pk):
     if request.method == 'POST':
         from datetime import timedelta
         
-        # Créer l'emprunt
-        loan = Loan.objects.create(
+        # Créer l'emprunt et mettre à jour la disponibilité du livre
+        loan = Loan(
             book=book,
             borrower=request.user,
             borrow_date=timezone.now(),
@@ -314,8 +395,10 @@ def borrow_book(request, pk):
             status='ACTIVE'
         )
         
-        # Mettre à jour la disponibilité du livre
-        book.borrow_book()
+        if not loan.checkout():
+            # Le dernier exemplaire a été emprunté entre-temps
+            messages.error(request, 'Ce livre n\'est pas disponible actuellement.')
+            return redirect('book_detail', pk=pk)
         
         messages.success(
             request,
@@ -330,62 +413,97 @@ def borrow_book(request, pk):
 @user_passes_test(is_librarian)
 def dashboard(request):
     """Tableau de bord pour les bibliothécaires"""
-    from django.contrib.auth.models import User
-    
-    # Statistiques des livres
-    total_books = Book.objects.count()
-    available_books = Book.objects.filter(status='AVAILABLE').count()
-    borrowed_books = Book.objects.filter(status='BORROWED').count()
-    maintenance_books = Book.objects.filter(status='MAINTENANCE').count()
-    
-    # Calcul du nombre total d'exemplaires disponibles
-    total_copies_available = sum(book.available_quantity for book in Book.objects.all())
-    total_copies = sum(book.quantity for book in Book.objects.all())
-    
-    # Statistiques des emprunts
-    active_loans = Loan.objects.filter(status='ACTIVE').count()
-    overdue_loans = Loan.objects.filter(status='OVERDUE').count()
-    returned_loans = Loan.objects.filter(status='RETURNED').count()
-    total_loans = Loan.objects.count()
-    
-    # Statistiques des utilisateurs
-    total_users = User.objects.count()
-    total_borrowers = UserProfile.objects.filter(user_type__in=['STUDENT', 'TEACHER', 'STAFF']).count()
-    total_librarians = UserProfile.objects.filter(user_type='LIBRARIAN').count()
+    # Compteurs : instantané en cache, calculé en quelques agrégats SQL
+    stats = get_library_stats()
     
-    # Emprunts récents et en retard
+    # Emprunts récents et en retard (listes bornées)
     recent_loans = Loan.objects.filter(status__in=['ACTIVE', 'OVERDUE']).select_related('book', 'borrower', 'borrower__profile')[:10]
-    overdue_list = Loan.objects.filter(status='OVERDUE').select_related('book', 'borrower', 'borrower__profile')
+    overdue_list = Loan.objects.filter(status='OVERDUE').select_related('book', 'borrower', 'borrower__profile').order_by('due_date')[:DASHBOARD_OVERDUE_LIMIT]
     
-    # Livres les plus empruntés (top 5)
-    from django.db.models import Count
-    popular_books = Book.objects.annotate(
-        loan_count=Count('loans')
-    ).filter(loan_count__gt=0).order_by('-loan_count')[:5]
+    # Livres les plus empruntés (top 5), depuis l'origine et sur 30 jours
+    popular = popular_books(limit=5)
+    popular_recent = popular_books(days=POPULAR_DAYS, limit=5)
     
     context = {
-        # Livres
-        'total_books': total_books,
-        'available_books': available_books,
-        'borrowed_books': borrowed_books,
-        'maintenance_books': maintenance_books,
-        'total_copies': total_copies,
-        'total_copies_available': total_copies_available,
-        
-        # Emprunts
-        'active_loans': active_loans,
-        'overdue_loans': overdue_loans,
-        'returned_loans': returned_loans,
-        'total_loans': total_loans,
-        
-        # Utilisateurs
-        'total_users': total_users,
-        'total_borrowers': total_borrowers,
-        'total_librarians': total_librarians,
+        **asdict(stats),
         
         # Listes
         'recent_loans': recent_loans,
         'overdue_list': overdue_list,
-        'popular_books': popular_books,
+        'popular_books': popular,
+        'popular_recent': popular_recent,
+        'popular_days': POPULAR_DAYS,
     }
-    return render(request, 'website/dashboard.html', context)
\ No newline at end of file
+    return render(request, 'website/dashboard.html', context)
+
+
+# Exports (bibliothécaires)
+def _export_response(request, name, headers, rows):
+    """Réponse en flux : les lignes sont lues et écrites au fur et à mesure"""
+    fmt = request.GET.get('format', 'csv')
+    response = StreamingHttpResponse(stream(fmt, headers, rows), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{name}-{timezone.localdate():%Y%m%d}.{fmt}"'
+    return response
+
+
+@login_required
+@user_passes_test(is_librarian)
+def export_books(request):
+    """Export CSV/JSONL du catalogue, avec les filtres de la liste des livres"""
+    form = BookSearchForm(request.GET)
+    if request.GET.get('format', 'csv') not in FORMATS or not form.is_valid():
+        return HttpResponseBadRequest('Paramètres d\'export invalides')
+    headers, rows = book_rows(**form.cleaned_data)
+    return _export_response(request, 'livres', headers, rows)
+
+
+@login_required
+@user_passes_test(is_librarian)
+def export_loans(request):
+    """Export CSV/JSONL des emprunts (statut, période d'emprunt)"""
+    form = LoanExportForm(request.GET)
+    if request.GET.get('format', 'csv') not in FORMATS or not form.is_valid():
+        return HttpResponseBadRequest('Paramètres d\'export invalides')
+    headers, rows = loan_rows(**form.cleaned_data)
+    return _export_response(request, 'emprunts', headers, rows)
+
+
+def _autocomplete_params(request):
+    """Terme (vide s'il est trop court) et nombre de résultats demandés"""
+    term = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), 1), AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError:
+        limit = AUTOCOMPLETE_LIMIT
+    return (term if len(term) >= MIN_TERM_LENGTH else ''), limit
+
+
+@login_required
+@user_passes_test(is_librarian)
+def autocomplete_books(request):
+    """Livres par ISBN ou début de mot : ``?q=...&available=1`` (JSON)"""
+    term, limit = _autocomplete_params(request)
+    if not term:
+        return JsonResponse({'results': []})
+    books = Book.objects.only('id', 'title', 'author', 'isbn', 'available_quantity')
+    if request.GET.get('available') == '1':
+        books = books.filter(available_quantity__gt=0, status='AVAILABLE')
+    books = search_books(books, term)[:limit]
+    return JsonResponse({'results': [
+        {'id': book.pk, 'label': book_label(book), 'available_quantity': book.available_quantity}
+        for book in books
+    ]})
+
+
+@login_required
+@user_passes_test(is_librarian)
+def autocomplete_borrowers(request):
+    """Emprunteurs par début de nom, d'identifiant ou de matricule : ``?q=...`` (JSON)"""
+    term, limit = _autocomplete_params(request)
+    if not term:
+        return JsonResponse({'results': []})
+    users = User.objects.filter(profile__user_type__in=['STUDENT', 'TEACHER', 'STAFF']).select_related('profile').only(
+        'id', 'username', 'first_name', 'last_name', 'profile__matricule',
+    )
+    users = search_users(users, term).order_by('last_name', 'first_name', 'id')[:limit]
+    return JsonResponse({'results': [{'id': user.pk, 'label': borrower_label(user)} for user in users]})